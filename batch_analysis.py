@@ -0,0 +1,115 @@
+# To use this script: python batch_analysis.py AAPL MSFT "Tesla Inc" --workers 3
+# or: python batch_analysis.py --file tickers.txt --out reports
+#
+# Runs the company financial analysis crew for many companies without the
+# Streamlit UI. Reports are written as each company finishes, and a
+# checkpoint file lets an interrupted batch pick up where it left off.
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+load_dotenv()
+
+REQUIRED_KEYS = ["OPENAI_API_KEY", "SERPER_API_KEY", "SEC_API_API_KEY"]
+
+
+def analyze(company_name, use_local_llm):
+    """Run the full crew for one company inside a worker process."""
+    from stock_analysis import build_crew
+    from tools.llm_clients import get_llm
+
+    crew, timer = build_crew(company_name, get_llm(use_local_llm, priority="batch"))
+    timer.start()
+    result = crew.kickoff()
+    return str(result), timer.report()
+
+
+def report_path(out_dir, company_name):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", company_name).strip("_") or "report"
+    return os.path.join(out_dir, slug + ".md")
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"done": {}, "failed": {}}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch company financial analysis")
+    parser.add_argument("companies", nargs="*", help="company names or tickers")
+    parser.add_argument("--file", help="file with one company name or ticker per line")
+    parser.add_argument("--out", default="reports", help="directory for finished reports")
+    parser.add_argument("--workers", type=int, default=2, help="companies analyzed at once")
+    parser.add_argument("--local-llm", action="store_true", help="use the local Ollama model")
+    parser.add_argument("--retry-failed", action="store_true", help="rerun companies that failed last time")
+    args = parser.parse_args(argv)
+
+    companies = list(args.companies)
+    if args.file:
+        with open(args.file) as f:
+            companies += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    companies = list(dict.fromkeys(companies))
+    if not companies:
+        parser.error("no companies given")
+
+    missing = [key for key in REQUIRED_KEYS if not os.environ.get(key)]
+    if missing:
+        parser.error("missing environment variables: " + ", ".join(missing))
+
+    os.makedirs(args.out, exist_ok=True)
+    checkpoint_path = os.path.join(args.out, "checkpoint.json")
+    checkpoint = load_checkpoint(checkpoint_path)
+    pending = [c for c in companies if c not in checkpoint["done"]
+               and (args.retry_failed or c not in checkpoint["failed"])]
+    skipped = len(companies) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} of {len(companies)} companies already in {checkpoint_path}")
+
+    # Workers are spawned fresh and share the on-disk filing, search and
+    # embedding caches through FINANCIAL_ANALYSIS_CACHE_DIR.
+    os.environ["FINANCIAL_ANALYSIS_CACHE_DIR"] = os.path.abspath(
+        os.environ.get("FINANCIAL_ANALYSIS_CACHE_DIR", ".cache"))
+    context = multiprocessing.get_context("spawn")
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as executor:
+        futures = {executor.submit(analyze, company, args.local_llm): company for company in pending}
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                result, timing = future.result()
+            except Exception as e:
+                checkpoint["failed"][company] = repr(e)
+                print(f"FAILED {company}: {e!r}", file=sys.stderr)
+            else:
+                path = report_path(args.out, company)
+                with open(path, "w") as f:
+                    f.write(f"# Financial Analysis Report for {company}\n\n{result}\n\n```\n{timing}\n```\n")
+                checkpoint["done"][company] = path
+                checkpoint["failed"].pop(company, None)
+                print(f"Finished {company} -> {path}")
+            save_checkpoint(checkpoint_path, checkpoint)
+
+    print(f"{len(checkpoint['done'])} done, {len(checkpoint['failed'])} failed "
+          f"in {time.monotonic() - started:.0f}s")
+    return 1 if checkpoint["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# To use this script: python -m benchmarks.index_benchmark <10-K filing URL>
+#
+# Compares recall@4 and memory of the flat, sq8 and ivfpq FAISS indexes
+# against exact (flat) search, on the chunks of a real 10-K.
+
+import argparse
+import time
+
+import numpy as np
+
+from tools.embedding_pipeline import get_embeddings
+from tools.quantized_index import INDEX_TYPES, build_index, index_bytes, recall_at_k
+from tools.sec_tools import SECTools
+
+QUESTIONS = [
+    "What was total revenue for the fiscal year?",
+    "What are the main risk factors?",
+    "How much long-term debt does the company have?",
+    "What was diluted earnings per share?",
+    "How much cash was returned to shareholders through buybacks and dividends?",
+    "What are the company's reportable segments?",
+    "Were there any material weaknesses in internal control?",
+    "What legal proceedings is the company involved in?",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FAISS index recall@4 vs memory benchmark")
+    parser.add_argument("url", help="link to a 10-K filing on sec.gov")
+    parser.add_argument("--recall-target", type=float, default=0.95)
+    args = parser.parse_args(argv)
+
+    docs = SECTools.filing_chunks(args.url, "10-K")
+    embeddings = get_embeddings()
+    vectors = np.asarray(embeddings.embed_documents([d.page_content for d in docs]), dtype="float32")
+    queries = np.asarray(embeddings.embed_documents(QUESTIONS), dtype="float32")
+    print(f"{len(docs)} chunks, {vectors.shape[1]} dimensions, {len(QUESTIONS)} questions\n")
+
+    flat = build_index(vectors, "flat")
+    _, truth = flat.search(queries, 4)
+    flat_bytes = index_bytes(flat)
+
+    print(f"{'requested':<10} {'built':<22} {'recall@4':>9} {'bytes':>12} {'vs flat':>8} {'build s':>8}")
+    for index_type in INDEX_TYPES:
+        started = time.monotonic()
+        index = build_index(vectors, index_type, args.recall_target)
+        elapsed = time.monotonic() - started
+        size = index_bytes(index)
+        print(f"{index_type:<10} {type(index).__name__:<22} {recall_at_k(index, queries, truth):>9.3f} "
+              f"{size:>12,} {size / flat_bytes:>8.2f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
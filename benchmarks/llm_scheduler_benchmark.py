@@ -0,0 +1,157 @@
+# To use this script: python -m benchmarks.llm_scheduler_benchmark
+#
+# Runs interactive and batch load against a local stub of an Ollama server,
+# once with requests sent straight to it and once through the LLM scheduler,
+# and compares latency per priority, failures and throughput.
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+
+from tools.llm_scheduler import LLMScheduler, ScheduledTransport
+
+
+class StubServer():
+    """Stand-in for a single Ollama server.
+
+    `slots` requests are decoded in parallel, each one slower the more are
+    active; the rest wait, and past `max_queue` waiting requests get a 503.
+    """
+
+    def __init__(self, slots=4, max_queue=16, seconds_per_kchar=0.05, base_seconds=0.2, contention=0.25):
+        self.slots = threading.Semaphore(slots)
+        self.max_queue = max_queue
+        self.seconds_per_kchar = seconds_per_kchar
+        self.base_seconds = base_seconds
+        self.contention = contention
+        self.active = 0
+        self.waiting = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                status, reply = stub.complete(json.loads(body))
+                payload = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = "http://127.0.0.1:{}/v1/chat/completions".format(self.httpd.server_address[1])
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def complete(self, request):
+        prompt = request["messages"][-1]["content"]
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                return 503, {"error": {"message": "server busy"}}
+            self.waiting += 1
+        with self.slots:
+            with self._lock:
+                self.waiting -= 1
+                self.active += 1
+                active = self.active
+            time.sleep((self.base_seconds + self.seconds_per_kchar * len(prompt) / 1000) * (1 + self.contention * (active - 1)))
+            with self._lock:
+                self.active -= 1
+        return 200, {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def call(client, url, prompt, timeout):
+    """POST a chat completion, backing off on 429/503 like the OpenAI client does."""
+    started = time.monotonic()
+    for attempt in range(6):
+        try:
+            response = client.post(url, json={"model": "phi3:mini", "messages": [{"role": "user", "content": prompt}]}, timeout=timeout)
+        except httpx.TimeoutException:
+            return time.monotonic() - started, "timeout"
+        if response.status_code not in (429, 503):
+            return time.monotonic() - started, "ok" if response.status_code == 200 else str(response.status_code)
+        time.sleep(min(8, float(response.headers.get("retry-after", 0.5 * 2 ** attempt))))
+    return time.monotonic() - started, str(response.status_code)
+
+
+def run(server, scheduler, args):
+    results = {"interactive": [], "batch": []}
+    lock = threading.Lock()
+
+    def client(priority):
+        transport = ScheduledTransport(scheduler, priority) if scheduler else httpx.HTTPTransport()
+        return httpx.Client(transport=transport)
+
+    def batch_request(i):
+        prompt = "x" * (random.Random(i).choice([500, 800, 1200, 12000]))
+        latency, status = call(batch_client, server.url, prompt, args.timeout)
+        with lock:
+            results["batch"].append((latency, status))
+
+    def interactive_user(seed):
+        rng = random.Random(seed)
+        http = client("interactive")
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            latency, status = call(http, server.url, "x" * rng.choice([1500, 4000]), args.timeout)
+            with lock:
+                results["interactive"].append((latency, status))
+            time.sleep(rng.uniform(0.5, 1.5))
+
+    batch_client = client("batch")
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.batch_threads + args.users) as executor:
+        users = [executor.submit(interactive_user, i) for i in range(args.users)]
+        list(executor.map(batch_request, range(args.batch)))
+        for user in users:
+            user.result()
+    return results, time.monotonic() - started
+
+
+def summarize(label, results, elapsed):
+    for priority, samples in results.items():
+        latencies = np.array([latency for latency, status in samples if status == "ok"])
+        failed = sum(status != "ok" for _, status in samples)
+        p50, p95 = (np.percentile(latencies, [50, 95]) if len(latencies) else (float("nan"), float("nan")))
+        print(f"{label:<10} {priority:<12} {len(samples):>6} {failed:>7} {p50:>8.2f} {p95:>8.2f}")
+    print(f"{label:<10} {'wall':<12} {elapsed:>6.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local LLM scheduler benchmark against a stub server")
+    parser.add_argument("--batch", type=int, default=120, help="batch requests to send")
+    parser.add_argument("--batch-threads", type=int, default=32, help="threads sending batch requests")
+    parser.add_argument("--users", type=int, default=3, help="interactive users")
+    parser.add_argument("--seconds", type=float, default=20, help="how long interactive users keep asking")
+    parser.add_argument("--slots", type=int, default=4, help="stub server parallel slots")
+    parser.add_argument("--timeout", type=float, default=30, help="client timeout per request")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10} {'priority':<12} {'reqs':>6} {'failed':>7} {'p50 s':>8} {'p95 s':>8}")
+    for label in ("direct", "scheduled"):
+        server = StubServer(slots=args.slots)
+        scheduler = LLMScheduler(max_limit=4 * args.slots) if label == "scheduled" else None
+        results, elapsed = run(server, scheduler, args)
+        summarize(label, results, elapsed)
+        if scheduler:
+            print(f"{'':<10} scheduler {scheduler.stats()}")
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# To use this script: python -m benchmarks.startup_benchmark [--runs 3]
+#
+# Cold start of each Streamlit app in a fresh interpreter: time spent
+# importing modules, time to render the first page (through Streamlit's
+# AppTest, no browser needed), and which heavy packages that first page
+# pulled in. None of them should be loaded before a run is started.
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+APPS = ["company_financial_analysis.py", "news_summarization.py", "file_summarization.py"]
+
+HEAVY = ["crewai", "crewai_tools", "langchain", "langchain_community", "langchain_openai",
+         "unstructured", "faiss", "pypdf", "yfinance", "sec_api"]
+
+# The apps prompt for missing keys on startup, which would block a headless run
+DUMMY_KEYS = ["OPENAI_API_KEY", "LANGCHAIN_API_KEY", "SERPER_API_KEY"]
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "exceptions": [str(e.value) for e in at.exception],
+    "heavy": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\S.*)$")
+
+
+def cold_start(app):
+    """First render of `app` in a new interpreter, with per-package import times."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    for key in DUMMY_KEYS:
+        env.setdefault(key, "benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, app, json.dumps(HEAVY)],
+        cwd=root, env=env, capture_output=True, text=True, timeout=600,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # Top-level imports only (nested ones are indented), microseconds cumulative
+    imports = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports[match.group(2)] = int(match.group(1)) / 1e6
+    result["import_seconds"] = sum(imports.values())
+    result["slowest"] = sorted(imports.items(), key=lambda item: -item[1])[:5]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit app import and first-render benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per app, the median is reported")
+    parser.add_argument("apps", nargs="*", default=APPS)
+    args = parser.parse_args(argv)
+
+    print(f"{'app':<32} {'render s':>9} {'import s':>9}  heavy packages loaded")
+    for app in args.apps:
+        try:
+            runs = [cold_start(app) for _ in range(args.runs)]
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"{app:<32} failed: {e}")
+            continue
+        render = statistics.median(run["seconds"] for run in runs)
+        imports = statistics.median(run["import_seconds"] for run in runs)
+        print(f"{app:<32} {render:>9.2f} {imports:>9.2f}  {', '.join(runs[-1]['heavy']) or 'none'}")
+        print(f"{'':<32} slowest imports: "
+              + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in runs[-1]["slowest"]))
+        for exception in runs[-1]["exceptions"]:
+            print(f"{'':<32} exception: {exception}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,14 @@
 # To use this script: streamlit run file_summarization.py 
 
 
-from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
-from crewai_tools import PDFSearchTool
 import streamlit as st
 
 import os, getpass
 from dotenv import load_dotenv
 load_dotenv()
 
+from tools.pdf_store import pdf_store
+
 def _set_if_undefined(var: str):
     if not os.environ.get(var):
         os.environ[var] = getpass.getpass(f"Please provide your {var}")
@@ -21,16 +20,6 @@ os.environ['LANGCHAIN_TRACING_V2'] = 'true'
 os.environ['LANGCHAIN_ENDPOINT'] = 'https://api.smith.langchain.com'
 os.environ["LANGCHAIN_PROJECT"] = "CrewAI - Ask your Document"
 
-# gpt-4-turbo - latest, most expensive
-open_ai_llm = ChatOpenAI(model_name="gpt-4-turbo")
-
-# local LLM
-local_llm = ChatOpenAI(
-    openai_api_base="http://192.168.1.158:11434/v1",
-    openai_api_key="ollama",
-    model_name="phi3:mini"
-)
-
 title = 'AI Document Content Summarizer'
 
 st.title(title)
@@ -41,28 +30,47 @@ if use_local_llm:
 else:
     st.write('Using OpenAI')
 
-uploaded_file = st.file_uploader("Choose a file", type=['pdf'])
-
-def save_uploaded_file(uploaded_file, save_path):
-    with open(save_path, "wb") as file:
-        file.write(uploaded_file.getbuffer())
-
-# Directory where files will be saved
-save_directory = "test_data"
-os.makedirs(save_directory, exist_ok=True)
-
-# If a file has been uploaded
-if uploaded_file is not None:
-    # Define the full file path
-    save_path = os.path.join(save_directory, uploaded_file.name)
-
-    # Save the uploaded file
-    save_uploaded_file(uploaded_file, save_path)
-
-    # Display success message
-    st.success(f"File saved successfully at: {save_path}")
-else:
-    st.info("Upload a file to ask it questions.")
+uploaded_files = st.file_uploader("Choose files", type=['pdf'], accept_multiple_files=True)
+
+# Uploads are stored by content hash, so re-uploads and follow-up questions reuse the saved index.
+# Indexing starts right away in the background; questions are answered from the pages indexed so far.
+# Each upload is hashed and written once; later reruns look its digest up
+if 'digests' not in st.session_state:
+    st.session_state.digests = {}
+ingestions = []
+for uploaded_file in uploaded_files:
+    upload_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    digest = st.session_state.digests.get(upload_id)
+    if digest is None or not os.path.exists(pdf_store.pdf_path(digest)):
+        uploaded_file.seek(0)
+        st.session_state.digests[upload_id] = pdf_store.add(uploaded_file.name, uploaded_file)
+    digest = st.session_state.digests[upload_id]
+    ingestions.append(pdf_store.ingest(digest))
+    st.success(f"File saved successfully at: {pdf_store.pdf_path(digest)}")
+if not uploaded_files:
+    st.info("Upload files to ask them questions.")
+
+def show_progress():
+    for ingestion in ingestions:
+        if ingestion.error is not None:
+            st.error(f'{ingestion.name}: indexing failed ({ingestion.error})')
+        elif ingestion.done:
+            st.caption(f'{ingestion.name}: {ingestion.pages_total} pages indexed')
+        else:
+            st.progress(ingestion.progress(), text=f'{ingestion.name}: {ingestion.pages_indexed} of {ingestion.pages_total or "?"} pages indexed')
+
+# Redraw just the progress bars every second while the rest of the page stays put
+if hasattr(st, 'fragment') and not all(ingestion.done for ingestion in ingestions):
+    show_progress = st.fragment(run_every=1)(show_progress)
+show_progress()
+
+with st.sidebar:
+    st.subheader('Stored documents')
+    for entry in pdf_store.entries():
+        names = ", ".join(entry["names"]) or entry["digest"][:12]
+        status = "indexed" if entry["indexed"] else "not indexed"
+        st.caption(f'{names} - {entry["bytes"] / 1024 ** 2:.1f} MB, {status}')
+        st.button('Remove', key=f'evict-{entry["digest"]}', on_click=pdf_store.evict, args=(entry["digest"],))
 
 task_description = st.text_area(
     'Task Description',
@@ -81,11 +89,6 @@ task_expected_output = st.text_area(
     height=200
 )
 
-if use_local_llm:
-    llm = local_llm
-else:
-    llm = open_ai_llm
-
 if 'clicked' not in st.session_state:
     st.session_state.clicked = False
 
@@ -94,17 +97,21 @@ def click_button():
 
 def resset_button():
     st.session_state.clicked = False
+    run = st.session_state.pop('run', None)
+    if run is not None:
+        # A run still going in the background must not report or email its result
+        run.cancel()
 
 button_click = st.button("Ask it a question", on_click=click_button, disabled=st.session_state.clicked)
 
-if st.session_state.clicked and uploaded_file is not None and task_description is not None and task_expected_output is not None:
-    st.write('Initiated.')
-    st.write('Running Task...')
-    
+def build(run):
+    from crewai import Agent, Task, Crew, Process
+    from tools.llm_cache import llm_cache
+    from tools.llm_clients import get_llm
+    from tools.pdf_ingest import document_search_tool
+
     # Initialize the tools
-    pdf_read_tool = PDFSearchTool(
-        pdf=save_path,
-    )
+    pdf_read_tool = document_search_tool(ingestions)
 
     researcher = Agent(
         role='Financial News Analyst Agent',
@@ -113,7 +120,7 @@ if st.session_state.clicked and uploaded_file is not None and task_description i
         verbose=True,
         allow_delegation=False,
         tools=[pdf_read_tool],
-        llm=llm
+        llm=get_llm(use_local_llm, callbacks=run.callbacks)
     )
 
     # Define the tasks
@@ -124,19 +131,34 @@ if st.session_state.clicked and uploaded_file is not None and task_description i
     )
 
     # Instantiate the crew
-    document_crew = Crew(
+    llm_cache.reset_stats()
+    return Crew(
         agents=[researcher],
         tasks=[research_task],
         process=Process.sequential,  # Tasks will be executed one after the other,
         verbose=True
     )
-    # Begin the task execution
-    result = document_crew.kickoff()
-    st.text_area(
-        'AI Response',
-        result,
-        height=800
-    )
+
+if st.session_state.clicked and ingestions and task_description is not None and task_expected_output is not None:
+    st.write('Initiated.')
+    st.write('Running Task...')
+    # crewai, langchain and the tools are only imported once a run starts (mostly in
+    # build, off the script thread), keeping the first paint fast
+    from tools.crew_runner import CrewRun, follow
+
+    # The crew runs in the background and streams its progress here; a rerun reattaches to the same run
+    if 'run' not in st.session_state:
+        st.session_state.run = CrewRun(build).start()
+    result = follow(st.session_state.run)
+    if result is not None:
+        from tools.llm_cache import llm_cache
+
+        st.text_area(
+            'AI Response',
+            result,
+            height=800
+        )
+        st.caption(llm_cache.report())
     st.button('Start Over', on_click=resset_button)
 else:
     st.warning('Please provide a task description and expected output, and upload a file.')
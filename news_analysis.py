@@ -0,0 +1,73 @@
+import functools
+import os
+
+from tools.mail_queue import get_mail_queue
+from tools.news_store import format_articles
+
+INDUSTRIES = ["Financial Services", "Banking", "Real Estate", "Energy", "Entertainment",
+              "Media and Communications", "Retail", "Pharmaceuticals", "Biotech",
+              "Health Care", "Food Products", "Transportation"]
+
+TASK_DESCRIPTION = """Search and filter the latest financial news across various platforms to identify articles and reports indicating major news events in the {industry} industry.
+    Focus on news related to severe risks to audit quality, alleged fraud, restatements, or bankruptcy.
+    Summarize key findings and flag any articles that require further detailed analysis.
+    """
+
+TASK_EXPECTED_OUTPUT = """A compiled list of any financial news identified as major news.
+    Do not include any PCAOB reports.
+    Do not include any reports older than three months ago.
+    For each general news topic found:
+    - Summarize the major news.
+    - Include any links to original articles.
+    - Flag the news by type - fraud, bankruptcy, restatement, or severe audit risks.
+    """
+
+email_sender = 'hiddenkirby@gmail.com'
+#email_recipients = ['skuo@simatree1.com','rkirby@simatree1.com','jhu@simatree1.com']
+email_recipients = ['rkirby@simatree1.com']
+
+@functools.lru_cache(maxsize=None)
+def web_rag_tool():
+    # Created once per process on first use; searching happens up front through tools.news_store
+    from crewai_tools import WebsiteSearchTool
+    return WebsiteSearchTool()
+
+
+def build_news_crew(industry, articles, llm, task_description=None, task_expected_output=None):
+    """Crew that reports on the new `articles` found for `industry`."""
+    from crewai import Agent, Task, Crew, Process
+
+    task_description = task_description or TASK_DESCRIPTION.format(industry=industry)
+    task_expected_output = task_expected_output or TASK_EXPECTED_OUTPUT
+
+    # Define the agents
+    researcher = Agent(
+        role='Financial News Analyst Agent',
+        goal=f'To review the provided news articles and report recent news related to severe risks to audit quality, fraud, restatement or bankruptcy in the {industry} industry.',
+        backstory=f"A highly experienced analyst with a keen eye for details that could impact {industry} market and investor decisions.",
+        verbose=True,
+        allow_delegation=False,
+        tools=[web_rag_tool()],
+        llm=llm
+    )
+
+    # Define the tasks
+    research_task = Task(
+        description=task_description + "\n\nNEW ARTICLES\n----------\n" + format_articles(articles),
+        expected_output=task_expected_output,
+        agent=researcher
+    )
+
+    # Instantiate the crew
+    return Crew(
+        agents=[researcher],
+        tasks=[research_task],
+        process=Process.sequential,  # Tasks will be executed one after the other,
+        verbose=True
+    )
+
+
+def send_email(subject, body, recipients=None):
+    """Queue an email for the background sender; returns a Future of the delivery."""
+    os.environ.setdefault('SMTP_USERNAME', email_sender)
+    return get_mail_queue().send(email_sender, recipients or email_recipients, subject, body)
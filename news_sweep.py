@@ -0,0 +1,146 @@
+# To use this script: python news_sweep.py --every 6h
+# or once, for a few industries: python news_sweep.py --once --industries Banking Energy
+#
+# Sweeps every industry for new audit, fraud, restatement and bankruptcy
+# news. All searches go through one shared, rate-limited fetch stage (a
+# query shared by several industries is sent once), industries are
+# summarized concurrently, and each recipient gets one consolidated email.
+
+import argparse
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from news_analysis import INDUSTRIES, build_news_crew, email_recipients, send_email
+from tools.llm_cache import llm_cache
+from tools.llm_clients import get_llm
+from tools.news_store import NewsStore, fetch_news, news_queries
+from tools.search_tools import SearchTools
+
+UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+class RateLimiter():
+    """Token bucket allowing `rate` calls per second with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_stage(industries, rate, workers):
+    """Run every distinct query of `industries` once, rate limited; returns query -> results."""
+    queries = list(dict.fromkeys(q for industry in industries for q in news_queries(industry)))
+    limiter = RateLimiter(rate, burst=workers)
+
+    def fetch(query):
+        limiter.acquire()
+        return SearchTools.serper("news", query).get("news", [])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(queries, executor.map(fetch, queries)))
+
+
+def summarize(industry, articles, llm, store):
+    result = str(build_news_crew(industry, articles, llm).kickoff())
+    store.commit(industry, articles)
+    return result
+
+
+def sweep(industries, llm, recipients, rate, workers, concurrency):
+    started = time.monotonic()
+    llm_cache.reset_stats()
+    results = fetch_stage(industries, rate, workers)
+    store = NewsStore()
+    new = {}
+    for industry in industries:
+        articles = store.filter_new(industry, fetch_news(industry, fetch=results.__getitem__))
+        if articles:
+            new[industry] = articles
+    print(f"{len(results)} searches, new articles: "
+          + (", ".join(f"{i} {len(a)}" for i, a in new.items()) or "none"))
+    if not new:
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {industry: executor.submit(summarize, industry, articles, llm, store)
+                   for industry, articles in new.items()}
+    reports = []
+    for industry, future in futures.items():
+        try:
+            reports.append(f"Major News Events for {industry}\n{'=' * 40}\n{future.result()}")
+        except Exception as e:
+            print(f"FAILED {industry}: {e!r}", file=sys.stderr)
+
+    if reports:
+        subject = f"AI Research & Reporting - {datetime.now():%Y-%m-%d %H:%M}"
+        body = "\n\n".join(reports)
+        deliveries = [send_email(subject, body, [recipient]) for recipient in recipients]
+        for recipient, delivery in zip(recipients, deliveries):
+            try:
+                delivery.result()
+            except Exception as e:
+                print(f"Email to {recipient} failed: {e!r}", file=sys.stderr)
+    print(llm_cache.report())
+    print(f"Sweep finished in {time.monotonic() - started:.0f}s")
+
+
+def parse_interval(value):
+    match = re.fullmatch(r"(\d+)([mhd])", value.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError("interval must look like 30m, 6h or 1d")
+    return int(match.group(1)) * UNITS[match.group(2)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scheduled multi-industry news sweep")
+    parser.add_argument("--every", type=parse_interval, default=parse_interval("6h"),
+                        help="time between sweeps, e.g. 30m, 6h, 1d (default 6h)")
+    parser.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    parser.add_argument("--industries", nargs="+", default=INDUSTRIES, choices=INDUSTRIES)
+    parser.add_argument("--recipients", nargs="+", default=email_recipients)
+    parser.add_argument("--rate", type=float, default=5.0, help="search requests per second")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=3, help="industries summarized at once")
+    parser.add_argument("--local-llm", action="store_true", help="use the local Ollama model")
+    args = parser.parse_args(argv)
+
+    llm = get_llm(args.local_llm, priority="batch")
+    while True:
+        # Sweeps are aligned to the interval, like a cron schedule
+        next_run = (time.time() // args.every + 1) * args.every
+        try:
+            sweep(args.industries, llm, args.recipients, args.rate, args.fetch_workers, args.concurrency)
+        except Exception as e:
+            print(f"Sweep failed: {e!r}", file=sys.stderr)
+            if args.once:
+                return 1
+        if args.once:
+            return 0
+        print(f"Next sweep at {datetime.fromtimestamp(next_run):%Y-%m-%d %H:%M}")
+        time.sleep(max(0, next_run - time.time()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+from textwrap import dedent
+
+from crewai import Agent, Task, Crew
+
+from tools.browser_tools import BrowserTools
+from tools.calculator_tools import CalculatorTools
+from tools.market_tools import MarketTools
+from tools.search_tools import SearchTools
+from tools.sec_tools import SECTools
+from tools.ExaSearchTool import ExaSearchTool
+from tools.filing_prefetch import filing_prefetcher
+from tools.task_timing import TaskTimer
+from tools.xbrl_tools import XBRLTools
+from prompts import RECOMMEND_DESCRIPTION, RECOMMEND_EXPECTED_OUTPUT
+
+from langchain_community.tools.yahoo_finance_news import YahooFinanceNewsTool
+
+class StockAnalysisAgents():
+    def __init__(self, llm):
+        self.llm = llm
+
+    def financial_analyst(self):
+        return Agent(
+            role='The Best Financial Analyst',
+            goal="""Impress all customers with your financial data 
+            and market trends analysis""",
+            backstory="""The most seasoned financial analyst with 
+            lots of expertise in stock market analysis and investment
+            strategies that is working for a super important customer.""",
+            verbose=True,
+            tools=[
+                BrowserTools.scrape_and_summarize_website(self.llm),
+                SearchTools.search_internet,
+                CalculatorTools.calculate,
+                MarketTools.peer_metrics,
+                XBRLTools.query_facts,
+                XBRLTools.ratio_table,
+                SECTools.search_10q,
+                SECTools.search_10k,
+                ExaSearchTool.search,
+                ExaSearchTool.find_similar,
+                ExaSearchTool.get_contents
+            ],
+            llm=self.llm
+        )
+
+    def research_analyst(self):
+        return Agent(
+            role='Staff Research Analyst',
+            goal="""Being the best at gather, interpret data and amaze
+            your customer with it""",
+            backstory="""Known as the BEST research analyst, you're
+            skilled in sifting through news, company announcements, 
+            and market sentiments. Now you're working on a super 
+            important customer""",
+            verbose=True,
+            tools=[
+                BrowserTools.scrape_and_summarize_website(self.llm),
+                SearchTools.search_internet,
+                SearchTools.search_news,
+                YahooFinanceNewsTool(),
+                SECTools.search_10q,
+                SECTools.search_10k,
+                ExaSearchTool.search,
+                ExaSearchTool.find_similar,
+                ExaSearchTool.get_contents
+            ],
+            llm=self.llm
+    )
+
+    def investment_advisor(self):
+        return Agent(
+            role='Private Investment Advisor',
+            goal="""Impress your customers with full analyses over stocks
+            and complete investment recommendations""",
+            backstory="""You're the most experienced investment advisor
+            and you combine various analytical insights to formulate
+            strategic investment advice. You are now working for
+            a super important customer you need to impress.""",
+            verbose=True,
+            tools=[
+                BrowserTools.scrape_and_summarize_website(self.llm),
+                SearchTools.search_internet,
+                SearchTools.search_news,
+                CalculatorTools.calculate,
+                MarketTools.peer_metrics,
+                YahooFinanceNewsTool()
+            ],
+            llm=self.llm
+    )
+
+class StockAnalysisTasks():
+  def research(self, agent, companyName):
+    return Task(
+      description=dedent(f"""
+        Collect and summarize recent news articles, press
+        releases, and market analyses related to the stock and
+        its industry.
+        Pay special attention to any significant events, market
+        sentiments, and analysts' opinions. Also include upcoming 
+        events like earnings and others.
+        Selected company by the customer: {companyName}
+      """),
+      expected_output=dedent("""
+      Your final answer MUST be a report that includes a
+        comprehensive summary of the latest news, any notable
+        shifts in market sentiment, and potential impacts on 
+        the stock.
+        Also make sure to return the stock ticker.
+  
+        Make sure to use the most recent data as possible.
+      """),
+      agent=agent,
+      async_execution=True
+    )
+    
+  def financial_analysis(self, agent, context=None): 
+    return Task(
+      description=dedent(f"""
+        Conduct a thorough analysis of the stock's financial
+        health and market performance. 
+        This includes examining key financial metrics such as
+        P/E ratio, EPS growth, revenue trends, and 
+        debt-to-equity ratio. 
+        Also, analyze the stock's performance in comparison 
+        to its industry peers and overall market trends.
+      """),
+      expected_output=dedent("""
+      Your final report MUST expand on the summary provided
+      but now including a clear assessment of the stock's
+      financial standing, its strengths and weaknesses, 
+      and how it fares against its competitors in the current
+      market scenario.
+
+      Make sure to use the most recent data possible.
+      """),
+      agent=agent,
+      context=context
+    )
+
+  def filings_analysis(self, agent, companyName):
+    return Task(
+      description=dedent(f"""
+        Analyze the latest 10-Q and 10-K filings from EDGAR for
+        the stock in question. 
+        Focus on key sections like Management's Discussion and
+        Analysis, financial statements, insider trading activity, 
+        and any disclosed risks.
+        Extract relevant data and insights that could influence
+        the stock's future performance.   
+        Selected company by the customer: {companyName}
+      """),
+      expected_output=dedent("""
+        Your final answer must be an expanded report that now
+        also highlights significant findings from these filings,
+        including any red flags or positive indicators for
+        your customer. 
+      """),
+      agent=agent,
+      async_execution=True
+    )
+
+
+def build_crew(company_name, llm, task_description=RECOMMEND_DESCRIPTION,
+               task_expected_output=RECOMMEND_EXPECTED_OUTPUT):
+    """Assemble the stock analysis crew for one company.
+
+    Returns the crew and the TaskTimer tracking its tasks.
+    """
+    # start pulling the latest 10-Q/10-K while the agents get going
+    filing_prefetcher.prefetch_company(company_name)
+
+    agents = StockAnalysisAgents(llm)
+    tasks = StockAnalysisTasks()
+
+    research_analyst_agent = agents.research_analyst()
+    financial_analyst_agent = agents.financial_analyst()
+    # separate instance so the filings branch can run alongside the financial analysis
+    filings_analyst_agent = agents.financial_analyst()
+    investment_advisor_agent = agents.investment_advisor()
+
+    # research and filings run concurrently, financial analysis waits on
+    # research only and the recommendation waits on all three
+    timer = TaskTimer()
+    research_task = timer.track('research', tasks.research(research_analyst_agent, company_name))
+    filings_task = timer.track('filings', tasks.filings_analysis(filings_analyst_agent, company_name))
+    financial_task = timer.track(
+      'financial',
+      tasks.financial_analysis(financial_analyst_agent, context=[research_task]),
+      depends_on=['research']
+    )
+    recommend_task = timer.track('recommend', Task(
+      description=dedent(task_description),
+      expected_output=dedent(task_expected_output),
+      agent=investment_advisor_agent,
+      context=[research_task, financial_task, filings_task]
+    ), depends_on=['research', 'financial', 'filings'])
+    
+    crew = Crew(
+        agents=[
+            research_analyst_agent,
+            financial_analyst_agent,
+            filings_analyst_agent,
+            investment_advisor_agent
+        ],
+        tasks=[
+            research_task,
+            filings_task,
+            financial_task,
+            recommend_task
+        ],
+        verbose=2
+    )
+
+    return crew, timer
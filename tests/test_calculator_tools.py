@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("streamlit")
+
+from tools.calculator_tools import CalculatorTools
+
+
+@pytest.mark.parametrize("expression, expected", [
+  ("[1,2]+[3,4]", "[4, 6]"),
+  ("mean([1,2] + [3,4])", "5"),
+  ("[1,2]*2", "[2, 4]"),
+  ("[1,2]-[3,4]", "[-2, -2]"),
+  ("[10,20]/[2,4]", "[5, 5]"),
+  ("(1, 2) * (3, 4)", "[3, 8]"),
+  ("200*7", "1400"),
+])
+def test_list_arithmetic_is_element_wise(expression, expected):
+  assert CalculatorTools.evaluate(expression) == expected
+
+
+def test_named_series():
+  result = CalculatorTools.evaluate("net_income = [94.7, 97.0]; shares = [15.7, 15.5]; eps = net_income / shares")
+  assert result.splitlines()[0].split() == ["net_income", "shares", "eps"]
+  assert result.splitlines()[1].split()[-1] == "6.03185"
+
+
+def test_round_min_max():
+  assert CalculatorTools.evaluate("round(2.345, 2)") == "2.35"
+  assert CalculatorTools.evaluate("min([3, 1, 2])") == "1"
+  assert CalculatorTools.evaluate("max([1, 5], [4, 2])") == "[4, 5]"
+
+
+def test_internal_names_are_not_callable():
+  with pytest.raises(ValueError):
+    CalculatorTools.evaluate("_array([1, 2])")
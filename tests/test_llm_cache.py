@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from tools.llm_cache import LLMCache, split_prompt
+
+SYSTEM = "You are The Best Financial Analyst. Tools: search_internet, calculate."
+LLM = "gpt-4-turbo"
+
+
+class SameVector():
+  """Embeds every text to the same vector, like a model that only reads the shared prefix."""
+
+  def embed_query(self, text):
+    return [1.0, 0.0, 0.0]
+
+
+def chat_prompt(question, scratchpad=""):
+  messages = [("SystemMessage", "system", SYSTEM), ("HumanMessage", "human", question + scratchpad)]
+  return json.dumps([
+    {"lc": 1, "type": "constructor", "id": ["langchain", "schema", "messages", name], "kwargs": {"content": content, "type": kind}}
+    for name, kind, content in messages
+  ])
+
+
+@pytest.fixture
+def cache(tmp_path):
+  return LLMCache(mode="semantic", embeddings=SameVector(), path=str(tmp_path / "responses.sqlite"))
+
+
+def test_prompts_for_different_companies_do_not_match(cache):
+  cache.update(chat_prompt("Summarize the latest news for Apple"), LLM, ["apple answer"])
+  assert cache.lookup(chat_prompt("Summarize the latest news for Microsoft"), LLM) is None
+
+
+def test_rephrased_question_matches(cache):
+  cache.update(chat_prompt("Summarize the latest news for Apple"), LLM, ["apple answer"])
+  assert cache.lookup(chat_prompt("Summarize latest news about Apple"), LLM) == ["apple answer"]
+  assert cache.stats()["semantic_hits"] == 1
+
+
+def test_later_agent_steps_do_not_match(cache):
+  question = "Summarize the latest news for Apple"
+  cache.update(chat_prompt(question, "\nThought:"), LLM, ["first step"])
+  later = "\nThought: I should search\nAction: search_internet\nObservation: Apple results"
+  assert cache.lookup(chat_prompt(question, later), LLM) is None
+
+
+def test_long_questions_only_match_exactly(cache):
+  question = "Summarize the latest news for Apple. " + "Context sentence. " * 100
+  cache.update(chat_prompt(question), LLM, ["apple answer"])
+  assert cache.lookup(chat_prompt(question + "More."), LLM) is None
+  assert cache.lookup(chat_prompt(question), LLM) == ["apple answer"]
+
+
+def test_split_prompt_embeds_only_the_question():
+  scope, question = split_prompt(chat_prompt("Summarize the news for Apple", "\nThought: search"))
+  assert question == "Summarize the news for Apple"
+  assert scope != split_prompt(chat_prompt("Summarize the news for Apple", "\nThought: done"))[0]
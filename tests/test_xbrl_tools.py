@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("streamlit")
+
+from tools.xbrl_tools import COLUMNS, XBRLTools
+
+# Quarterly revenue per fiscal year (calendar quarters); the fourth quarter is
+# only reported inside the 10-K's full year
+QUARTERS = {2022: [100, 110, 120, 130], 2023: [110, 121, 132, 143]}
+QUARTER_ENDS = ["03-31", "06-30", "09-30", "12-31"]
+
+
+def synthetic_facts():
+  rows = []
+
+  def fact(value, start, end, fy, fp, form):
+    rows.append(("us-gaap", "Revenues", "USD", float(value), pd.Timestamp(start), pd.Timestamp(end),
+                 fy, fp, form, pd.Timestamp(end) + pd.Timedelta(days=40), "{}-{}".format(fy, fp)))
+
+  for year, values in QUARTERS.items():
+    starts = ["{}-01-01".format(year), "{}-04-01".format(year), "{}-07-01".format(year)]
+    for quarter, (start, value) in enumerate(zip(starts, values[:3])):
+      fact(value, start, "{}-{}".format(year, QUARTER_ENDS[quarter]), year, "Q{}".format(quarter + 1), "10-Q")
+    fact(sum(values[:3]), "{}-01-01".format(year), "{}-09-30".format(year), year, "Q3", "10-Q")
+    fact(sum(values), "{}-01-01".format(year), "{}-12-31".format(year), year, "FY", "10-K")
+  df = pd.DataFrame.from_records(rows, columns=COLUMNS)
+  for column in ["taxonomy", "concept", "unit", "fp", "form"]:
+    df[column] = df[column].astype("category")
+  return df
+
+
+def test_quarterly_series_derives_fourth_quarter_from_10k():
+  series = XBRLTools.series("TEST", "revenue", annual=False, periods=8, df=synthetic_facts())
+  assert list(series) == QUARTERS[2022] + QUARTERS[2023]
+  assert series.index[-1] == pd.Timestamp("2023-12-31")
+
+
+def test_quarterly_growth_is_year_over_year():
+  table = XBRLTools.ratios("TEST", annual=False, periods=4, df=synthetic_facts())
+  assert len(table) == 4
+  assert table["revenue_growth"].tolist() == pytest.approx([0.1] * 4)
+
+
+def test_annual_growth():
+  table = XBRLTools.ratios("TEST", annual=True, periods=1, df=synthetic_facts())
+  assert table["revenue_growth"].tolist() == pytest.approx([506 / 460 - 1])
@@ -1,7 +1,16 @@
+import ast
+import functools
 import os
 from exa_py import Exa
 from langchain.agents import tool
 
+from tools.ttl_cache import TTLCache
+
+# Characters of page text kept per result
+CONTENT_CHARS = 1000
+
+_contents_cache = TTLCache(maxsize=512, ttl=3600)
+
 class ExaSearchTool:
 	@tool
 	def search(query: str):
@@ -20,15 +29,33 @@ class ExaSearchTool:
 		"""Get the contents of a webpage.
 		The ids must be passed in as a list, a list of ids returned from `search`.
 		"""
-		ids = eval(ids)
-		contents = str(ExaSearchTool._exa().get_contents(ids))
-		print(contents)
-		contents = contents.split("URL:")
-		contents = [content[:1000] for content in contents]
-		return "\n\n".join(contents)
+		ids = ExaSearchTool._parse_ids(ids)
+		missing = [id for id in dict.fromkeys(ids) if id not in _contents_cache]
+		if missing:
+			# Ask Exa for only the text we keep instead of whole pages
+			response = ExaSearchTool._exa().get_contents(missing, text={"max_characters": CONTENT_CHARS})
+			for result in response.results:
+				_contents_cache.set(result.id, ExaSearchTool._format(result))
+		contents = [_contents_cache.get(id) for id in ids]
+		return "\n\n".join(content for content in contents if content)
+
+	def _parse_ids(ids):
+		try:
+			parsed = ast.literal_eval(ids)
+		except (ValueError, SyntaxError):
+			parsed = ids.strip("[]").split(",")
+		if not isinstance(parsed, (list, tuple, set)):
+			parsed = [parsed]
+		ids = [str(id).strip().strip("'\"") for id in parsed]
+		return [id for id in ids if id]
+
+	def _format(result):
+		text = (result.text or "")[:CONTENT_CHARS]
+		return f"Title: {result.title}\nURL: {result.url}\nID: {result.id}\nText: {text}"
 
 	def tools():
 		return [ExaSearchTool.search, ExaSearchTool.find_similar, ExaSearchTool.get_contents]
 
+	@functools.lru_cache(maxsize=None)
 	def _exa():
 		return Exa(api_key=os.environ["EXA_API_KEY"])
\ No newline at end of file
@@ -0,0 +1,66 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+TOKEN = re.compile(r"[a-z0-9]+(?:[.,'\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this
+to was were what which who will with how did does do our we you your their
+""".split())
+
+
+def tokenize(text):
+  return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index():
+  """Okapi BM25 inverted index over LangChain documents, built in one pass."""
+
+  def __init__(self, docs, k1=1.5, b=0.75):
+    self.docs = docs
+    self.k1 = k1
+    self.b = b
+    self.postings = defaultdict(list)
+    self.lengths = []
+    for i, doc in enumerate(docs):
+      counts = Counter(tokenize(doc.page_content))
+      self.lengths.append(sum(counts.values()))
+      for term, tf in counts.items():
+        self.postings[term].append((i, tf))
+    self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+  def idf(self, term):
+    n = len(self.postings.get(term, ()))
+    return math.log(1 + (len(self.docs) - n + 0.5) / (n + 0.5))
+
+  def search(self, query, k=4):
+    """Top `k` (document, score) pairs; quoted phrases found verbatim get a boost."""
+    scores = defaultdict(float)
+    for term in set(tokenize(query)):
+      idf = self.idf(term)
+      for i, tf in self.postings.get(term, ()):
+        norm = 1 - self.b + self.b * self.lengths[i] / self.avg_length
+        scores[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+    phrases = [p.lower() for p in re.findall(r'"([^"]+)"', query)]
+    if phrases:
+      top = max(scores.values(), default=1.0)
+      for i in list(scores):
+        text = self.docs[i].page_content.lower()
+        scores[i] += top * sum(phrase in text for phrase in phrases)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [(self.docs[i], score) for i, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+  """Merge several ranked document lists, scoring each by sum(1 / (k + rank))."""
+  scores = defaultdict(float)
+  docs = {}
+  for ranking in rankings:
+    for rank, doc in enumerate(ranking):
+      key = doc.page_content
+      docs.setdefault(key, doc)
+      scores[key] += 1.0 / (k + rank + 1)
+  return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
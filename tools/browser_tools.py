@@ -1,41 +1,108 @@
-from requests_html import HTMLSession
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from requests_html import DEFAULT_USER_AGENT
 from langchain.tools import tool
 from crewai import Agent, Task
 from unstructured.partition.html import partition_html
-import streamlit as st
+
+from tools.crew_runner import report
+from tools.http_cache import http_cache
+from tools.render_pool import render_pool
+
+CHUNK_SIZE = 8000
+
+# Upper bound on simultaneous summarization calls, keep it under the provider's rate limit
+SUMMARY_MAX_CONCURRENCY = int(os.environ.get("SUMMARY_MAX_CONCURRENCY", 4))
+
+# Shared by every summary in the process, across concurrent tasks and tool calls
+_summary_slots = threading.BoundedSemaphore(SUMMARY_MAX_CONCURRENCY)
 
 class BrowserTools:
 
-    @tool("Scrape website content")
-    def scrape_and_summarize_website(website):
-        """Useful to scrape and summarize a website content"""
-        session = HTMLSession()
-        response = session.get(website)
-        
-        # Render the page, in case there's JavaScript dynamically rendering elements
-        response.html.render()
+    def scrape_and_summarize_website(llm):
+        """The scraping tool for an agent, summarizing pages with `llm`, the run's chat model.
+
+        Summaries then go through the same backend, cache and local LLM
+        scheduling as the agents themselves.
+        """
+        @tool("Scrape website content")
+        def scrape_and_summarize_website(website):
+            """Useful to scrape and summarize a website content"""
+            return BrowserTools.scrape(website, llm)
+        return scrape_and_summarize_website
+
+    def scrape(website, llm):
+        html = http_cache.get(website, headers={'User-Agent': DEFAULT_USER_AGENT})
+
+        # Render the page only if the static HTML is too thin, in case there's JavaScript dynamically rendering elements
+        html = render_pool.render(website, html)
 
         # Use partition_html on the HTML, not on the text
-        elements = partition_html(html=response.html.html)
+        elements = partition_html(html=html)
         
-        # Joining the extracted elements into a single string, then splitting into chunks
+        # Joining the extracted elements into a single string, then summarizing it chunk by chunk
         content = "\n\n".join([str(el) for el in elements])
-        content = [content[i:i + 8000] for i in range(0, len(content), 8000)]
-        summaries = []
-
-        for chunk in content:
-            agent = Agent(
-                role='Principal Researcher',
-                goal='Do amazing research and summaries based on the content you are working with',
-                backstory="You're a Principal Researcher at a big company and you need to do research about a given topic.",
-                allow_delegation=False
-            )
-            task = Task(
-                agent=agent,
-                description=f'Analyze and summarize the content below, make sure to include the most relevant information in the summary, return only the summary nothing else.\n\nCONTENT\n----------\n{chunk}'
-            )
-            summary = task.execute()
-            summaries.append(summary)
-
-        st.write('Scraping Website to memory {}... '.format(website))
+        summary = BrowserTools.summarize(content, llm)
+
+        report('Scraping Website to memory {}... '.format(website))
+        return summary
+
+    def summarize(content, llm, max_concurrency=None):
+        """Map-reduce summary of `content`, written by `llm`.
+
+        Chunks are summarized in parallel (results keep the page order), with
+        at most SUMMARY_MAX_CONCURRENCY calls in flight across the whole
+        process. If the joined partial summaries are still longer than one
+        chunk they are grouped and merged again, level by level, until they fit.
+        """
+        chunks = [content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=max_concurrency or SUMMARY_MAX_CONCURRENCY) as executor:
+            summaries = list(executor.map(lambda chunk: BrowserTools._summarize_chunk(chunk, llm), chunks))
+            while len(summaries) > 1 and len("\n\n".join(summaries)) > CHUNK_SIZE:
+                groups = BrowserTools._group(summaries)
+                summaries = list(executor.map(lambda group: BrowserTools._merge_summaries(group, llm), groups))
         return "\n\n".join(summaries)
+
+    def _group(summaries):
+        # At least two summaries per group so every level shrinks
+        groups, current = [], []
+        for summary in summaries:
+            if len(current) >= 2 and len("\n\n".join(current + [summary])) > CHUNK_SIZE:
+                groups.append(current)
+                current = []
+            current.append(summary)
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        elif current:
+            groups.append(current)
+        return groups
+
+    def _summarize_chunk(chunk, llm):
+        return BrowserTools._execute(
+            f'Analyze and summarize the content below, make sure to include the most relevant information in the summary, return only the summary nothing else.\n\nCONTENT\n----------\n{chunk}',
+            llm
+        )
+
+    def _merge_summaries(summaries, llm):
+        partials = "\n\n----------\n\n".join(summaries)
+        return BrowserTools._execute(
+            f'Combine the partial summaries below, taken in order from one document, into a single summary. Keep the most relevant information and return only the summary nothing else.\n\nPARTIAL SUMMARIES\n----------\n{partials}',
+            llm
+        )
+
+    def _execute(description, llm):
+        agent = Agent(
+            role='Principal Researcher',
+            goal='Do amazing research and summaries based on the content you are working with',
+            backstory="You're a Principal Researcher at a big company and you need to do research about a given topic.",
+            allow_delegation=False,
+            llm=llm
+        )
+        task = Task(
+            agent=agent,
+            description=description
+        )
+        with _summary_slots:
+            return task.execute()
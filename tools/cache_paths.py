@@ -0,0 +1,14 @@
+import os
+
+CACHE_ROOT = os.environ.get("FINANCIAL_ANALYSIS_CACHE_DIR", ".cache")
+
+
+def cache_dir(name):
+  """Return (and create) a named subdirectory of the shared on-disk cache.
+
+  All tools write under the same root so separate apps and worker
+  processes share what has already been downloaded or embedded.
+  """
+  path = os.path.join(CACHE_ROOT, name)
+  os.makedirs(path, exist_ok=True)
+  return path
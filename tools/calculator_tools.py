@@ -1,5 +1,61 @@
+import ast
+import functools
+import re
+
+import numpy as np
 from langchain.tools import tool
-import streamlit as st
+
+from tools.crew_runner import report
+
+
+def _round(value, decimals=0):
+  # Literals are floats, np.round needs an integer number of decimals
+  return np.round(value, int(decimals))
+
+
+def _reducer(elementwise, whole):
+  # min(x) reduces one list, min(a, b, ...) works element by element like Python's builtin
+  def reduce(*args):
+    if len(args) == 1:
+      return whole(args[0])
+    return functools.reduce(elementwise, args)
+  return reduce
+
+
+FUNCTIONS = {
+  "abs": np.abs,
+  "sqrt": np.sqrt,
+  "log": np.log,
+  "log10": np.log10,
+  "exp": np.exp,
+  "round": _round,
+  "min": _reducer(np.minimum, np.min),
+  "max": _reducer(np.maximum, np.max),
+  "sum": np.sum,
+  "mean": np.mean,
+}
+
+ALLOWED_NODES = (
+  ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+  ast.Call, ast.List, ast.Tuple,
+  ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+  ast.UAdd, ast.USub,
+)
+
+
+class _ListsToArrays(ast.NodeTransformer):
+  """Rewrite list and tuple literals as float arrays, so `[1, 2] + [3, 4]` adds element by element."""
+
+  def visit_List(self, node):
+    self.generic_visit(node)
+    return ast.Call(func=ast.Name(id="_array", ctx=ast.Load()),
+                    args=[ast.List(elts=node.elts, ctx=ast.Load())], keywords=[])
+
+  visit_Tuple = visit_List
+
+
+def _array(values):
+  return np.array(values, dtype="float64")
 
 
 class CalculatorTools():
@@ -9,7 +65,89 @@ class CalculatorTools():
     """Useful to perform any mathematical calculations, 
     like sum, minus, multiplication, division, etc.
     The input to this tool should be a mathematical 
-    expression, a couple examples are `200*7` or `5000/2*10`
+    expression, a couple examples are `200*7` or `5000/2*10`.
+    Several calculations can be done at once, one per line or
+    separated by `;`, and named lists of numbers compute a whole
+    series in one call, for example
+    `net_income = [94.7, 97.0, 99.8]; shares = [15.7, 15.5, 15.3]; eps = net_income / shares`.
+    Functions: abs, sqrt, log, log10, exp, round, min, max, sum, mean.
+    """
+    report('Calculating {}'.format(operation))
+    try:
+      return CalculatorTools.evaluate(operation)
+    except (SyntaxError, ValueError, NameError, TypeError, ArithmeticError) as e:
+      return "Error: {}".format(e)
+
+  def evaluate(operation):
+    """Evaluate one or more statements and return the result as text.
+
+    A single expression returns just its value; anything else returns a
+    table of every computed value, one column per name when lists are involved.
     """
-    st.write('Calculating {}'.format(operation))
-    return eval(operation)
\ No newline at end of file
+    statements = [s.strip() for s in re.split(r"[;\n]", operation) if s.strip()]
+    namespace = {}
+    outputs = []
+    for statement in statements:
+      name, expression = CalculatorTools._split_assignment(statement)
+      code, is_literal = CalculatorTools._compile(expression)
+      with np.errstate(all="ignore"):
+        value = eval(code, {"__builtins__": {}, "_array": _array}, {**FUNCTIONS, **namespace})
+      namespace[name or expression] = value
+      if not is_literal:
+        outputs.append(name or expression)
+
+    if len(statements) == 1 and name is None:
+      return CalculatorTools._format(value)
+    return CalculatorTools._table(namespace, outputs or list(namespace))
+
+  def _split_assignment(statement):
+    match = re.match(r"^([A-Za-z_]\w*)\s*=(?!=)\s*(.+)$", statement)
+    if match:
+      if match.group(1) in FUNCTIONS:
+        raise ValueError("cannot assign to function name {}".format(match.group(1)))
+      return match.group(1), match.group(2)
+    return None, statement
+
+  @functools.lru_cache(maxsize=1024)
+  def _compile(expression):
+    """Validate `expression` against the allowed syntax and compile it once."""
+    tree = ast.parse(expression, mode="eval")
+    for node in ast.walk(tree):
+      if not isinstance(node, ALLOWED_NODES):
+        raise ValueError("unsupported syntax: {}".format(type(node).__name__))
+      if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+          raise ValueError("only numbers are allowed, got {!r}".format(node.value))
+        # Floats throughout, so `**` can't build huge Python ints
+        node.value = float(node.value)
+      if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS):
+        raise ValueError("unsupported function call")
+    is_literal = isinstance(tree.body, (ast.List, ast.Tuple, ast.Constant))
+    tree = ast.fix_missing_locations(_ListsToArrays().visit(tree))
+    return compile(tree, "<calculation>", "eval"), is_literal
+
+  def _format(value):
+    if isinstance(value, np.ndarray):
+      if value.ndim == 0:
+        return CalculatorTools._format(value.item())
+      return "[" + ", ".join(CalculatorTools._format(v) for v in value.tolist()) + "]"
+    value = float(value)
+    if value.is_integer() and abs(value) < 1e15:
+      return str(int(value))
+    return "{:.6g}".format(value)
+
+  def _table(namespace, outputs):
+    vectors = {k: v for k, v in namespace.items() if isinstance(v, np.ndarray) and v.ndim == 1}
+    scalars = [k for k in outputs if k not in vectors]
+    lines = []
+    if vectors:
+      length = max(len(v) for v in vectors.values())
+      columns = [k for k in namespace if k in vectors]
+      cells = [[k] + [CalculatorTools._format(v[i]) if i < len(v) else "" for i in range(length)]
+               for k, v in ((k, vectors[k]) for k in columns)]
+      widths = [max(len(c) for c in column) for column in cells]
+      for row in range(length + 1):
+        lines.append("  ".join(column[row].rjust(width) for column, width in zip(cells, widths)))
+    for k in scalars:
+      lines.append("{} = {}".format(k, CalculatorTools._format(namespace[k])))
+    return "\n".join(lines)
@@ -0,0 +1,168 @@
+import contextvars
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+import streamlit as st
+
+# Characters of an observation or task output shown per event, and of the live LLM output
+EVENT_CHARS = 2000
+LIVE_CHARS = 3000
+
+# The run whose crew is executing in this context, see report
+_active_run = contextvars.ContextVar("crew_run", default=None)
+
+
+def report(message):
+  """Show a tool's progress `message` with the steps of the crew run calling it.
+
+  Crews run off the script thread, where Streamlit calls render nothing, so
+  tools report through here. Outside a run (batch scripts) it does nothing.
+  """
+  run = _active_run.get()
+  if run is not None:
+    run.log(message)
+
+
+class _TokenHandler(BaseCallbackHandler):
+  """Collects streamed LLM tokens per generation, so parallel agents don't interleave."""
+
+  def __init__(self, run):
+    self.run = run
+
+  def on_llm_new_token(self, token, *, run_id=None, **kwargs):
+    with self.run._lock:
+      self.run._live[run_id] = self.run._live.get(run_id, "") + token
+      self.run._latest = run_id
+
+  def on_llm_end(self, response, *, run_id=None, **kwargs):
+    with self.run._lock:
+      self.run._live.pop(run_id, None)
+
+
+class CrewRun():
+  """A crew built and kicked off in a background thread, recording what happens for the UI.
+
+  `build(run)` returns the crew to run, or None when there is nothing to do;
+  it should create its LLMs with `callbacks=run.callbacks` so tokens stream
+  in, and can use `run.log` and `run.extras` for anything the page shows
+  afterwards. `on_result(run, result)` runs in the same thread once the crew
+  finishes, so it happens once however many times the page reruns. Keep
+  the run in `st.session_state` and pass it to `follow` on every rerun, and
+  `cancel` it when the page drops it: a cancelled run does not start its
+  crew if it hasn't yet, and never calls `on_result`.
+  """
+
+  def __init__(self, build, on_result=None):
+    self.build = build
+    self.on_result = on_result
+    self.callbacks = [_TokenHandler(self)]
+    self.events = []
+    self.extras = {}
+    self.result = None
+    self.error = None
+    self.started = time.monotonic()
+    self._live = {}
+    self._latest = None
+    self._lock = threading.Lock()
+    self._done = threading.Event()
+    self._cancelled = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="crew-run", daemon=True)
+
+  def start(self):
+    self._thread.start()
+    return self
+
+  @property
+  def done(self):
+    return self._done.is_set()
+
+  @property
+  def cancelled(self):
+    return self._cancelled.is_set()
+
+  def cancel(self):
+    self._cancelled.set()
+
+  def log(self, title, text=""):
+    with self._lock:
+      self.events.append((title, str(text)[:EVENT_CHARS]))
+
+  def live_text(self):
+    with self._lock:
+      return self._live.get(self._latest, "")[-LIVE_CHARS:]
+
+  def _run(self):
+    _active_run.set(self)
+    try:
+      crew = self.build(self)
+      if crew is not None and not self.cancelled:
+        self.attach(crew)
+        self.result = crew.kickoff()
+        if self.on_result is not None and not self.cancelled:
+          self.on_result(self, self.result)
+    except Exception as e:
+      self.error = e
+    finally:
+      self._done.set()
+
+  def attach(self, crew):
+    crew.step_callback = self._on_step
+    for task in crew.tasks:
+      # Keep callbacks the task already has, such as TaskTimer's
+      task.callback = self._task_callback(task.callback)
+
+  def _on_step(self, step):
+    for item in step if isinstance(step, list) else [step]:
+      action, observation = item if isinstance(item, tuple) else (item, None)
+      if getattr(action, "tool", None):
+        text = "Input: {}".format(action.tool_input)
+        if observation is not None:
+          text += "\n\nResult: {}".format(observation)
+        self.log("Tool: {}".format(action.tool), text)
+      elif hasattr(action, "return_values"):
+        self.log("Agent answer", action.return_values.get("output", ""))
+
+  def _task_callback(self, previous):
+    def callback(output):
+      if previous is not None:
+        previous(output)
+      lines = (getattr(output, "description", "") or "").strip().splitlines()
+      text = getattr(output, "raw_output", None) or getattr(output, "raw", None) or str(output)
+      self.log("Task finished: {}".format(lines[0][:80] if lines else ""), text)
+    return callback
+
+
+def follow(run, poll=0.5):
+  """Show `run`'s steps and live LLM output until it finishes, then return its result.
+
+  Safe to call again after a Streamlit rerun: it redraws the steps so far
+  and carries on following the same run.
+  """
+  steps = st.container()
+  status = st.empty()
+  live = st.empty()
+  shown = 0
+  while True:
+    done = run.done
+    with run._lock:
+      events = run.events[shown:]
+    for title, text in events:
+      if not text:
+        steps.caption(title)
+        continue
+      with steps.expander(title):
+        st.text(text)
+    shown += len(events)
+    if done:
+      break
+    status.caption("Running for {:.0f}s...".format(time.monotonic() - run.started))
+    text = run.live_text()
+    if text:
+      live.code(text, language=None)
+    time.sleep(poll)
+  status.empty()
+  live.empty()
+  if run.error is not None:
+    st.error("The crew failed: {!r}".format(run.error))
+  return run.result
@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tools.cache_paths import cache_dir
+
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "openai")
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", 4))
+LOCAL_EMBEDDING_MODEL = os.environ.get("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+
+class CachedEmbeddings(Embeddings):
+  """Embeddings that only send text they haven't seen before.
+
+  Texts are keyed by sha256, so boilerplate repeated within a filing, the
+  overlap between chunks and chunks of filings embedded earlier all reuse
+  stored vectors. Unseen texts go to `backend` in batches of `batch_size`,
+  `concurrency` batches at a time. Vectors live in a SQLite file shared by
+  every process using the same cache directory.
+  """
+
+  def __init__(self, backend, model, batch_size=EMBEDDING_BATCH_SIZE, concurrency=EMBEDDING_CONCURRENCY, path=None):
+    self.backend = backend
+    self.model = model
+    self.batch_size = batch_size
+    self.concurrency = concurrency
+    self.path = path or os.path.join(cache_dir("embeddings"), "vectors.sqlite")
+    self.hits = 0
+    self.misses = 0
+    self._local = threading.local()
+    self._lock = threading.Lock()
+    with self._db() as db:
+      db.execute("CREATE TABLE IF NOT EXISTS vectors (model TEXT, hash TEXT, vector BLOB, PRIMARY KEY (model, hash))")
+
+  def _db(self):
+    db = getattr(self._local, "db", None)
+    if db is None:
+      db = self._local.db = sqlite3.connect(self.path, timeout=30)
+      db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+  def _lookup(self, hashes):
+    found = {}
+    for i in range(0, len(hashes), 500):
+      batch = hashes[i:i + 500]
+      rows = self._db().execute(
+        "SELECT hash, vector FROM vectors WHERE model = ? AND hash IN ({})".format(",".join("?" * len(batch))),
+        [self.model] + batch,
+      )
+      found.update((h, np.frombuffer(v, dtype="float32").tolist()) for h, v in rows)
+    return found
+
+  def _store(self, vectors):
+    with self._db() as db:
+      db.executemany(
+        "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)",
+        [(self.model, h, np.asarray(v, dtype="float32").tobytes()) for h, v in vectors.items()],
+      )
+
+  def embed_documents(self, texts):
+    hashes = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+    unique = dict(zip(hashes, texts))
+    vectors = self._lookup(list(unique))
+    missing = [h for h in unique if h not in vectors]
+    with self._lock:
+      self.hits += len(texts) - len(missing)
+      self.misses += len(missing)
+
+    if missing:
+      batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+      with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+        results = executor.map(lambda batch: self.backend.embed_documents([unique[h] for h in batch]), batches)
+        for batch, embedded in zip(batches, results):
+          new = dict(zip(batch, embedded))
+          self._store(new)
+          vectors.update(new)
+    return [vectors[h] for h in hashes]
+
+  def embed_query(self, text):
+    return self.embed_documents([text])[0]
+
+  def stats(self):
+    with self._lock:
+      return {"hits": self.hits, "misses": self.misses}
+
+
+@functools.lru_cache(maxsize=None)
+def get_embeddings(backend=None):
+  """Shared cached embeddings for `backend` (`openai` or `local`, default from EMBEDDING_BACKEND)."""
+  backend = backend or EMBEDDING_BACKEND
+  if backend == "openai":
+    from langchain_community.embeddings import OpenAIEmbeddings
+    embeddings = OpenAIEmbeddings()
+    return CachedEmbeddings(embeddings, "openai:" + embeddings.model)
+  if backend == "local":
+    # Runs fully offline once the model is downloaded; one model instance, so no concurrent batches
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    try:
+      embeddings = HuggingFaceEmbeddings(model_name=LOCAL_EMBEDDING_MODEL)
+    except ImportError as e:
+      raise ImportError("EMBEDDING_BACKEND=local needs sentence-transformers: pip install sentence-transformers") from e
+    return CachedEmbeddings(embeddings, "local:" + LOCAL_EMBEDDING_MODEL, concurrency=1)
+  raise ValueError("EMBEDDING_BACKEND must be openai or local, got {!r}".format(backend))
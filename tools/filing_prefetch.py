@@ -0,0 +1,118 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sec_api import QueryApi
+
+FORMS = ("10-Q", "10-K")
+
+# Items indexed ahead of time; these answer most financial analyst questions
+PREFETCH_SECTIONS = {
+  "10-K": ["7", "8", "1A"],
+  "10-Q": ["I-1", "I-2", "II-1A"],
+}
+
+
+class FilingPrefetcher():
+  """Resolves, downloads and indexes a ticker's latest 10-Q and 10-K in the background.
+
+  `prefetch` returns immediately; `latest_filing` and `wait` block only on
+  whatever part of that work hasn't finished yet. Each ticker is resolved
+  once per process, both forms in a single query API call.
+  """
+
+  def __init__(self, workers=None):
+    self._executor = ThreadPoolExecutor(
+      max_workers=workers or int(os.environ.get("PREFETCH_WORKERS", 4)),
+      thread_name_prefix="prefetch",
+    )
+    self._filings = {}
+    self._warming = {}
+    self._lock = threading.Lock()
+
+  def prefetch(self, ticker):
+    ticker = ticker.strip().upper()
+    with self._lock:
+      future = self._filings.get(ticker)
+      if future is None:
+        future = self._filings[ticker] = self._executor.submit(self._resolve, ticker)
+    return future
+
+  def prefetch_company(self, company):
+    """Prefetch for a company name or ticker, resolving the ticker in the background too."""
+    def resolve():
+      ticker = resolve_ticker(company)
+      if ticker:
+        self.prefetch(ticker)
+      return ticker
+    return self._executor.submit(resolve)
+
+  def latest_filing(self, ticker, form):
+    """Link to the latest `form` filing for `ticker`, or None if there isn't one."""
+    future = self.prefetch(ticker)
+    try:
+      return future.result().get(form)
+    except Exception:
+      # Don't cache failures, the next call should try again
+      with self._lock:
+        if self._filings.get(ticker.strip().upper()) is future:
+          del self._filings[ticker.strip().upper()]
+      raise
+
+  def wait(self, link):
+    """Block until any background download/indexing of `link` is done."""
+    with self._lock:
+      future = self._warming.get(link)
+    if future is not None:
+      future.exception()
+
+  def _resolve(self, ticker):
+    queryApi = QueryApi(api_key=os.environ['SEC_API_API_KEY'])
+    query = {
+      "query": {
+        "query_string": {
+          "query": f"ticker:{ticker} AND formType:(\"10-Q\" OR \"10-K\")"
+        }
+      },
+      "from": "0",
+      "size": "10",
+      "sort": [{ "filedAt": { "order": "desc" }}]
+    }
+    links = {}
+    for filing in queryApi.get_filings(query)['filings']:
+      links.setdefault(filing['formType'], filing['linkToFilingDetails'])
+    links = {form: link for form, link in links.items() if form in FORMS}
+    with self._lock:
+      for form, link in links.items():
+        if link not in self._warming:
+          self._warming[link] = self._executor.submit(self._warm, link, form)
+    return links
+
+  def _warm(self, link, form):
+    from tools.sec_tools import SECTools
+    SECTools.warm_filing(link, form, PREFETCH_SECTIONS[form])
+
+
+def resolve_ticker(company):
+  """Ticker for a company name (or a ticker passed as is), using SEC's ticker list."""
+  from tools.xbrl_tools import XBRLTools
+  tickers = XBRLTools._tickers()
+  candidate = company.strip().upper()
+  if candidate in tickers:
+    return candidate
+
+  def normalize(name):
+    name = re.sub(r"[^a-z0-9 ]", " ", name.lower())
+    name = re.sub(r"\b(inc|incorporated|corp|corporation|co|company|ltd|plc|holdings|group|the)\b", " ", name)
+    return " ".join(name.split())
+
+  wanted = normalize(company)
+  if not wanted:
+    return None
+  matches = [t for t, (cik, title) in tickers.items() if normalize(title) == wanted]
+  # Several share classes can share a title; the shortest ticker is usually the primary one
+  return min(matches, key=len) if matches else None
+
+
+filing_prefetcher = FilingPrefetcher()
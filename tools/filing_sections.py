@@ -0,0 +1,112 @@
+import re
+
+ITEM_HEADING = re.compile(r"^\s*item\s*(\d{1,2}[a-c]?)\s*[\.:\-–—]?(?:\s|$)", re.I)
+PART_HEADING = re.compile(r"^\s*part\s+(ii|i)\b", re.I)
+
+# Headings longer than this are sentences referring to an Item, not the heading itself
+MAX_HEADING_CHARS = 200
+
+SECTION_TITLES = {
+  "10-K": {
+    "1": "Business",
+    "1A": "Risk Factors",
+    "1B": "Unresolved Staff Comments",
+    "1C": "Cybersecurity",
+    "2": "Properties",
+    "3": "Legal Proceedings",
+    "4": "Mine Safety Disclosures",
+    "5": "Market for Registrant's Common Equity",
+    "6": "Reserved",
+    "7": "Management's Discussion and Analysis",
+    "7A": "Quantitative and Qualitative Disclosures About Market Risk",
+    "8": "Financial Statements and Supplementary Data",
+    "9": "Changes in and Disagreements with Accountants",
+    "9A": "Controls and Procedures",
+    "9B": "Other Information",
+    "10": "Directors, Executive Officers and Corporate Governance",
+    "11": "Executive Compensation",
+    "12": "Security Ownership",
+    "13": "Certain Relationships and Related Transactions",
+    "14": "Principal Accountant Fees and Services",
+    "15": "Exhibits and Financial Statement Schedules",
+  },
+  "10-Q": {
+    "I-1": "Financial Statements",
+    "I-2": "Management's Discussion and Analysis",
+    "I-3": "Quantitative and Qualitative Disclosures About Market Risk",
+    "I-4": "Controls and Procedures",
+    "II-1": "Legal Proceedings",
+    "II-1A": "Risk Factors",
+    "II-2": "Unregistered Sales of Equity Securities and Use of Proceeds",
+    "II-5": "Other Information",
+    "II-6": "Exhibits",
+  },
+}
+
+# Question keywords mapped to the sections that usually answer them
+ROUTES = {
+  "10-K": [
+    (r"risk", ["1A"]),
+    (r"md&a|management.s discussion|revenue|sales|margin|results of operations|outlook|liquidity|guidance|segment|growth", ["7"]),
+    (r"balance sheet|income statement|cash flow|financial statement|earnings per share|\beps\b|debt|assets|liabilit|equity|net income|note \d", ["8"]),
+    (r"legal|lawsuit|litigation|proceeding", ["3"]),
+    (r"business|product|competit|employee|customer|strategy", ["1"]),
+    (r"propert|facilit", ["2"]),
+    (r"market risk|interest rate|currency|foreign exchange|hedg", ["7A"]),
+    (r"control|material weakness|auditor|audit", ["9A", "14"]),
+    (r"repurchase|buyback|dividend|stockholder", ["5"]),
+    (r"compensation|salary|bonus", ["11"]),
+    (r"insider|beneficial owner|ownership", ["12"]),
+    (r"cyber", ["1C"]),
+  ],
+  "10-Q": [
+    (r"risk", ["II-1A"]),
+    (r"md&a|management.s discussion|revenue|sales|margin|results of operations|outlook|liquidity|guidance|segment|growth", ["I-2"]),
+    (r"balance sheet|income statement|cash flow|financial statement|earnings per share|\beps\b|debt|assets|liabilit|equity|net income|note \d", ["I-1"]),
+    (r"legal|lawsuit|litigation|proceeding", ["II-1"]),
+    (r"market risk|interest rate|currency|foreign exchange|hedg", ["I-3"]),
+    (r"control|material weakness", ["I-4"]),
+    (r"repurchase|buyback|unregistered", ["II-2"]),
+    (r"insider|trading arrangement|10b5-1", ["II-5"]),
+  ],
+}
+
+
+def split_sections(content, form):
+  """Split filing text (one element per line) into its Items.
+
+  Item headings show up twice, once in the table of contents and once
+  where the section starts, so each Item keeps its longest span.
+  """
+  lines = content.split("\n")
+  headings = []
+  part = "I"
+  for number, line in enumerate(lines):
+    if len(line) > MAX_HEADING_CHARS:
+      continue
+    part_match = PART_HEADING.match(line)
+    if part_match:
+      part = part_match.group(1).upper()
+      continue
+    item_match = ITEM_HEADING.match(line)
+    if item_match:
+      item = item_match.group(1).upper()
+      headings.append((number, "{}-{}".format(part, item) if form == "10-Q" else item))
+
+  sections = {}
+  for i, (start, key) in enumerate(headings):
+    end = headings[i + 1][0] if i + 1 < len(headings) else len(lines)
+    text = "\n".join(lines[start:end])
+    if key in SECTION_TITLES.get(form, {}) and len(text) > len(sections.get(key, "")):
+      sections[key] = text
+  return sections
+
+
+def route(question, form):
+  """Section keys likely to answer `question`, most specific first; empty if nothing matches."""
+  question = question.lower()
+  keys = []
+  for pattern, sections in ROUTES.get(form, []):
+    if re.search(pattern, question):
+      keys += [s for s in sections if s not in keys]
+  return keys
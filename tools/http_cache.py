@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tools.cache_paths import cache_dir
+
+
+class HTTPCache():
+  """Shared download layer: one pooled session plus an on-disk response cache.
+
+  Bodies are stored gzip-compressed under the sha256 of their content, with
+  a small metadata file per URL holding the validators (ETag/Last-Modified)
+  used to revalidate on the next request. Identical bodies served from
+  different URLs are stored once.
+  """
+
+  def __init__(self, path=None, pool_size=None, timeout=60):
+    self.path = path or cache_dir("http")
+    self.timeout = timeout
+    os.makedirs(os.path.join(self.path, "meta"), exist_ok=True)
+    os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+    pool_size = pool_size or int(os.environ.get("HTTP_POOL_SIZE", 16))
+    adapter = HTTPAdapter(
+      pool_connections=pool_size,
+      pool_maxsize=pool_size,
+      max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+    )
+    self.session = requests.Session()
+    self.session.mount("https://", adapter)
+    self.session.mount("http://", adapter)
+
+  def _meta_path(self, url):
+    return os.path.join(self.path, "meta", hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+  def _blob_path(self, digest):
+    return os.path.join(self.path, "blobs", digest + ".gz")
+
+  def _read_meta(self, url):
+    try:
+      with open(self._meta_path(url)) as f:
+        meta = json.load(f)
+    except (OSError, ValueError):
+      return None
+    if not os.path.exists(self._blob_path(meta["digest"])):
+      return None
+    return meta
+
+  def _read_blob(self, meta):
+    with gzip.open(self._blob_path(meta["digest"]), "rb") as f:
+      return f.read().decode(meta.get("encoding") or "utf-8", errors="replace")
+
+  def get(self, url, headers=None):
+    """Return the body of `url` as text, revalidating any cached copy."""
+    meta = self._read_meta(url)
+    request_headers = dict(headers or {})
+    if meta:
+      if meta.get("etag"):
+        request_headers["If-None-Match"] = meta["etag"]
+      if meta.get("last_modified"):
+        request_headers["If-Modified-Since"] = meta["last_modified"]
+      # Conditional requests must not be forced past the server cache.
+      request_headers.pop("Cache-Control", None)
+
+    try:
+      response = self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout)
+    except requests.RequestException:
+      if meta:
+        return self._read_blob(meta)
+      raise
+
+    with response:
+      if response.status_code == 304 and meta:
+        return self._read_blob(meta)
+      response.raise_for_status()
+      meta = self._store(url, response)
+    return self._read_blob(meta)
+
+  def _store(self, url, response):
+    digest = hashlib.sha256()
+    tmp = os.path.join(self.path, "blobs", ".tmp-{}-{}".format(os.getpid(), threading.get_ident()))
+    with gzip.open(tmp, "wb") as f:
+      for chunk in response.iter_content(chunk_size=64 * 1024):
+        digest.update(chunk)
+        f.write(chunk)
+    meta = {
+      "url": url,
+      "digest": digest.hexdigest(),
+      "etag": response.headers.get("ETag"),
+      "last_modified": response.headers.get("Last-Modified"),
+      "encoding": response.encoding,
+    }
+    blob = self._blob_path(meta["digest"])
+    if os.path.exists(blob):
+      os.remove(tmp)
+    else:
+      os.replace(tmp, blob)
+    meta_tmp = tmp + ".json"
+    with open(meta_tmp, "w") as f:
+      json.dump(meta, f)
+    os.replace(meta_tmp, self._meta_path(url))
+    return meta
+
+  def post(self, url, **kwargs):
+    """POST through the pooled session (responses are not cached here)."""
+    kwargs.setdefault("timeout", self.timeout)
+    return self.session.post(url, **kwargs)
+
+
+http_cache = HTTPCache()
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+
+from langchain_community.vectorstores import FAISS
+
+from tools.cache_paths import cache_dir
+from tools.quantized_index import INDEX_TYPES, build_store
+
+
+class IndexCache():
+  """Persistent store of FAISS indexes keyed by source document and embedding model.
+
+  Each entry is a directory holding `index.faiss` and `index.pkl` (the
+  layout written by `FAISS.save_local`). Entries are evicted least recently
+  used first once the store grows past `max_bytes`. New indexes are built
+  as `index_type` (flat, sq8 or ivfpq, see `tools.quantized_index`). The
+  `memory_entries` most recently used indexes also stay loaded, so repeated
+  questions about the same filing skip reading it back from disk.
+  """
+
+  def __init__(self, path=None, max_bytes=None, index_type=None, recall_target=None, memory_entries=None):
+    self.path = path or cache_dir("faiss")
+    self.max_bytes = max_bytes or int(os.environ.get("FAISS_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+    self.index_type = index_type or os.environ.get("FAISS_INDEX_TYPE", "flat")
+    self.recall_target = recall_target or float(os.environ.get("FAISS_RECALL_TARGET", 0.95))
+    if self.index_type not in INDEX_TYPES:
+      raise ValueError("FAISS_INDEX_TYPE must be one of {}".format(", ".join(INDEX_TYPES)))
+    self.memory_entries = memory_entries or int(os.environ.get("FAISS_MEMORY_ENTRIES", 8))
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._loaded = OrderedDict()
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def model_name(embeddings):
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+  def key(self, source, embeddings):
+    raw = "{}\n{}\n{}".format(self.model_name(embeddings), self.index_type, source)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+  def _entry(self, key):
+    return os.path.join(self.path, key)
+
+  def get(self, source, embeddings):
+    """Return the saved index for `source`, or None on a miss."""
+    key = self.key(source, embeddings)
+    entry = self._entry(key)
+    with self._lock:
+      store = self._loaded.get(key)
+      if store is not None and os.path.isdir(entry):
+        self._loaded.move_to_end(key)
+        self.hits += 1
+        os.utime(entry)
+        return store
+    if not os.path.exists(os.path.join(entry, "index.faiss")):
+      with self._lock:
+        self.misses += 1
+      return None
+    try:
+      store = self._load(entry, embeddings)
+    except Exception:
+      shutil.rmtree(entry, ignore_errors=True)
+      with self._lock:
+        self.misses += 1
+      return None
+    os.utime(entry)
+    with self._lock:
+      self.hits += 1
+    self._remember(key, store)
+    return store
+
+  def _remember(self, key, store):
+    with self._lock:
+      self._loaded[key] = store
+      self._loaded.move_to_end(key)
+      while len(self._loaded) > self.memory_entries:
+        self._loaded.popitem(last=False)
+
+  def put(self, source, embeddings, store):
+    entry = self._entry(self.key(source, embeddings))
+    tmp = "{}.tmp-{}-{}".format(entry, os.getpid(), threading.get_ident())
+    store.save_local(tmp)
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+    self._remember(os.path.basename(entry), store)
+    self.evict()
+    return store
+
+  def get_or_build(self, source, embeddings, build_documents):
+    """Load the index for `source`, building it from `build_documents()` on a miss."""
+    store = self.get(source, embeddings)
+    if store is None:
+      store = build_store(build_documents(), embeddings, self.index_type, self.recall_target)
+      self.put(source, embeddings, store)
+    return store
+
+  def _load(self, entry, embeddings):
+    import faiss
+    index_path = os.path.join(entry, "index.faiss")
+    try:
+      # Memory-map the vectors so large indexes are paged in on demand.
+      index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+      index = faiss.read_index(index_path)
+    with open(os.path.join(entry, "index.pkl"), "rb") as f:
+      docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+  def _entries(self):
+    entries = []
+    for name in os.listdir(self.path):
+      entry = os.path.join(self.path, name)
+      if not os.path.isdir(entry) or ".tmp-" in name:
+        continue
+      size = sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(entry) for f in files
+      )
+      entries.append((os.path.getmtime(entry), size, entry))
+    return entries
+
+  def size(self):
+    return sum(size for _, size, _ in self._entries())
+
+  def evict(self):
+    entries = sorted(self._entries())
+    total = sum(size for _, size, _ in entries)
+    while entries and total > self.max_bytes:
+      _, size, entry = entries.pop(0)
+      shutil.rmtree(entry, ignore_errors=True)
+      total -= size
+      with self._lock:
+        self._loaded.pop(os.path.basename(entry), None)
+        self.evictions += 1
+
+  def stats(self):
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "hit_rate": self.hits / lookups if lookups else 0.0,
+        "entries": len(self._entries()),
+        "bytes": self.size(),
+      }
+
+
+index_cache = IndexCache()
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from tools.cache_paths import cache_dir
+
+# off, exact (model + prompt + parameters) or semantic (exact, then the most similar earlier prompt)
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "exact")
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 86400))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+LLM_CACHE_SIMILARITY = float(os.environ.get("LLM_CACHE_SIMILARITY", 0.97))
+# Longer questions only match exactly; the local embedding model reads about 256 tokens
+LLM_CACHE_SEMANTIC_CHARS = int(os.environ.get("LLM_CACHE_SEMANTIC_CHARS", 1000))
+
+
+def _messages(prompt):
+  """(type, text) of each message in a chat prompt serialized by LangChain, or the prompt as one human message."""
+  try:
+    parsed = json.loads(prompt)
+  except ValueError:
+    parsed = None
+  if not isinstance(parsed, list) or not all(isinstance(m, dict) for m in parsed):
+    return [("human", prompt)]
+  messages = []
+  for message in parsed:
+    kwargs = message.get("kwargs", {})
+    kind = kwargs.get("type") or (message.get("id") or [""])[-1].replace("Message", "").lower()
+    content = kwargs.get("content", "")
+    messages.append((kind, content if isinstance(content, str) else json.dumps(content)))
+  return messages
+
+
+def _names(text):
+  # Capitalized words and numbers: companies, tickers, years, amounts
+  return sorted({word for word in re.findall(r"\w+(?:[.,&'-]\w+)*", text) if word[0].isupper() or any(c.isdigit() for c in word)})
+
+
+def split_prompt(prompt):
+  """(scope, question) for a semantic lookup.
+
+  The question is the last human message up to the agent's scratchpad
+  (from its first `Thought:` line) and is what gets embedded. Everything
+  else, the system message with the agent's role and tools, the
+  scratchpad, later messages, and the names and numbers in the question,
+  goes into `scope`, which must match exactly. So a prompt about another
+  company, or a later step of the same run, never reuses an answer.
+  """
+  messages = _messages(prompt)
+  last = max((i for i, (kind, _) in enumerate(messages) if kind == "human"), default=None)
+  if last is None:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest(), ""
+  question, marker, scratchpad = messages[last][1].partition("\nThought:")
+  scope = json.dumps([messages[:last], marker + scratchpad, messages[last + 1:], _names(question)])
+  return hashlib.sha256(scope.encode("utf-8")).hexdigest(), question.strip()
+
+
+class LLMCache(BaseCache):
+  """Persistent LangChain cache for LLM responses, passed as `cache=` to the chat models.
+
+  Entries are keyed by the model string LangChain builds (model name and
+  parameters) and the prompt, and stored in SQLite. In `semantic` mode an
+  exact miss falls back to the earlier prompt for the same model whose
+  embedding is closest, if its cosine similarity reaches `threshold`.
+  Only the question is compared that way, see `split_prompt`; questions
+  longer than `semantic_chars` only match exactly.
+  Prompts for a model named in `local_models` are embedded with the local
+  backend, so they never leave the machine.
+  Entries expire after `ttl` seconds and the least recently used are evicted
+  once the store grows past `max_bytes`.
+  """
+
+  def __init__(self, mode=LLM_CACHE_MODE, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES,
+               threshold=LLM_CACHE_SIMILARITY, embeddings=None, path=None,
+               semantic_chars=LLM_CACHE_SEMANTIC_CHARS):
+    if mode not in ("off", "exact", "semantic"):
+      raise ValueError("LLM_CACHE_MODE must be off, exact or semantic, got {!r}".format(mode))
+    self.mode = mode
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    self.threshold = threshold
+    self.semantic_chars = semantic_chars
+    self._embeddings = embeddings
+    self.local_models = set()
+    self.path = path or os.path.join(cache_dir("llm"), "responses.sqlite")
+    self._local = threading.local()
+    self._lock = threading.Lock()
+    self._pending = {}
+    self.reset_stats()
+    with self._db() as db:
+      db.execute(
+        "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, llm TEXT, value TEXT, vector BLOB,"
+        " bytes INTEGER, latency REAL, expires REAL, used REAL, scope TEXT)"
+      )
+      if "scope" not in [row[1] for row in db.execute("PRAGMA table_info(responses)")]:
+        # Stores written before semantic lookups were scoped; their vectors are never matched
+        db.execute("ALTER TABLE responses ADD COLUMN scope TEXT")
+      db.execute("CREATE INDEX IF NOT EXISTS responses_llm ON responses (llm)")
+
+  def reset_stats(self):
+    self.hits = 0
+    self.semantic_hits = 0
+    self.misses = 0
+    self.saved_seconds = 0.0
+
+  def _db(self):
+    db = getattr(self._local, "db", None)
+    if db is None:
+      db = self._local.db = sqlite3.connect(self.path, timeout=30)
+      db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+  def embeddings(self, llm_string):
+    if self._embeddings is not None:
+      return self._embeddings
+    from tools.embedding_pipeline import get_embeddings
+    local = any(model in llm_string for model in self.local_models)
+    return get_embeddings("local" if local else None)
+
+  @staticmethod
+  def _key(prompt, llm_string):
+    return hashlib.sha256("{}\n{}".format(llm_string, prompt).encode("utf-8")).hexdigest()
+
+  def lookup(self, prompt, llm_string):
+    if self.mode == "off":
+      return None
+    key = self._key(prompt, llm_string)
+    now = time.time()
+    row = self._db().execute(
+      "SELECT key, value, latency FROM responses WHERE key = ? AND expires > ?", (key, now)
+    ).fetchone()
+    semantic = False
+    if row is None and self.mode == "semantic":
+      row = self._similar(prompt, llm_string, now)
+      semantic = row is not None
+    if row is None:
+      with self._lock:
+        self.misses += 1
+        self._pending[key] = time.monotonic()
+      return None
+
+    with self._db() as db:
+      db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, row[0]))
+    with self._lock:
+      self.hits += 1
+      self.semantic_hits += semantic
+      self.saved_seconds += row[2]
+    return [loads(generation) for generation in json.loads(row[1])]
+
+  def _semantic(self, prompt):
+    """(scope, question) when `prompt`'s question is short enough to compare by embedding, else None."""
+    scope, question = split_prompt(prompt)
+    if not question or len(question) > self.semantic_chars:
+      return None
+    return scope, question
+
+  def _similar(self, prompt, llm_string, now):
+    semantic = self._semantic(prompt)
+    if semantic is None:
+      return None
+    scope, question = semantic
+    rows = self._db().execute(
+      "SELECT key, value, latency, vector FROM responses WHERE llm = ? AND scope = ? AND expires > ? AND vector IS NOT NULL",
+      (llm_string, scope, now),
+    ).fetchall()
+    if not rows:
+      return None
+    query = self._unit(self.embeddings(llm_string).embed_query(question))
+    vectors = np.stack([np.frombuffer(row[3], dtype="float32") for row in rows])
+    scores = vectors @ query
+    best = int(np.argmax(scores))
+    return rows[best][:3] if scores[best] >= self.threshold else None
+
+  @staticmethod
+  def _unit(vector):
+    vector = np.asarray(vector, dtype="float32")
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+  def update(self, prompt, llm_string, return_val):
+    if self.mode == "off":
+      return
+    key = self._key(prompt, llm_string)
+    with self._lock:
+      started = self._pending.pop(key, None)
+    latency = time.monotonic() - started if started is not None else 0.0
+    value = json.dumps([dumps(generation) for generation in return_val])
+    scope, vector = None, None
+    semantic = self._semantic(prompt) if self.mode == "semantic" else None
+    if semantic is not None:
+      scope, question = semantic
+      vector = self._unit(self.embeddings(llm_string).embed_query(question)).tobytes()
+    now = time.time()
+    with self._db() as db:
+      db.execute(
+        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (key, llm_string, value, vector, len(value) + len(vector or b""), latency, now + self.ttl, now, scope),
+      )
+    self.evict()
+
+  def evict(self):
+    """Drop expired entries, then the least recently used until the store fits in `max_bytes`."""
+    with self._db() as db:
+      db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+      total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+      if total <= self.max_bytes:
+        return
+      doomed = []
+      for key, size in db.execute("SELECT key, bytes FROM responses ORDER BY used"):
+        if total <= self.max_bytes:
+          break
+        doomed.append((key,))
+        total -= size
+      db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+  def clear(self, **kwargs):
+    with self._db() as db:
+      db.execute("DELETE FROM responses")
+
+  def stats(self):
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "hits": self.hits,
+        "semantic_hits": self.semantic_hits,
+        "misses": self.misses,
+        "hit_rate": self.hits / lookups if lookups else 0.0,
+        "saved_seconds": self.saved_seconds,
+      }
+
+  def report(self):
+    stats = self.stats()
+    return "LLM cache ({}): {:.0%} hit rate ({} hits, {} by similarity, {} misses), {:.1f}s saved".format(
+      self.mode, stats["hit_rate"], stats["hits"], stats["semantic_hits"], stats["misses"], stats["saved_seconds"]
+    )
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,63 @@
+import functools
+import os
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from tools.llm_cache import llm_cache
+from tools.llm_scheduler import ScheduledTransport, local_scheduler
+
+LOCAL_LLM_BASE_URL = os.environ.get("LOCAL_LLM_BASE_URL", "http://192.168.1.158:11434/v1")
+LOCAL_LLM_MODEL = "phi3:mini"
+
+# Semantic cache lookups for the local model embed its prompts locally as well
+llm_cache.local_models.add(LOCAL_LLM_MODEL)
+
+
+@functools.lru_cache(maxsize=None)
+def _http_client(priority=None):
+  # One connection pool per backend for the whole process, so clients built
+  # for each run (and each Streamlit rerun) reuse warm connections
+  if priority is None:
+    return httpx.Client()
+  return httpx.Client(transport=ScheduledTransport(local_scheduler, priority))
+
+
+# Passing callbacks (see tools.crew_runner) turns on token streaming
+
+def open_ai_llm(callbacks=None):
+  # gpt-4-turbo - latest, most expensive
+  return ChatOpenAI(
+    model_name="gpt-4-turbo",
+    cache=llm_cache,
+    http_client=_http_client(),
+    streaming=bool(callbacks),
+    callbacks=callbacks
+  )
+
+
+def local_llm(priority="interactive", callbacks=None):
+  # Every request this process makes to the Ollama server goes through the shared
+  # scheduler; batch callers pass priority="batch" so interactive requests in the
+  # same process are served first
+  return ChatOpenAI(
+    openai_api_base=LOCAL_LLM_BASE_URL,
+    openai_api_key="ollama",
+    model_name=LOCAL_LLM_MODEL,
+    cache=llm_cache,
+    http_client=_http_client(priority),
+    streaming=bool(callbacks),
+    callbacks=callbacks
+  )
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_llm(use_local_llm, priority):
+  return local_llm(priority) if use_local_llm else open_ai_llm()
+
+
+def get_llm(use_local_llm=False, priority="interactive", callbacks=None):
+  """Chat model for the chosen backend; clients without callbacks are shared by the whole process."""
+  if callbacks:
+    return local_llm(priority, callbacks) if use_local_llm else open_ai_llm(callbacks)
+  return _shared_llm(use_local_llm, priority)
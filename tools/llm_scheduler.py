@@ -0,0 +1,225 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+import httpx
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+LOCAL_LLM_MAX_CONCURRENCY = int(os.environ.get("LOCAL_LLM_MAX_CONCURRENCY", 8))
+LOCAL_LLM_MAX_QUEUE = int(os.environ.get("LOCAL_LLM_MAX_QUEUE", 64))
+LOCAL_LLM_QUEUE_TIMEOUT = float(os.environ.get("LOCAL_LLM_QUEUE_TIMEOUT", 300))
+LOCAL_LLM_SHORT_PROMPT = int(os.environ.get("LOCAL_LLM_SHORT_PROMPT", 2000))
+LOCAL_LLM_BATCH = int(os.environ.get("LOCAL_LLM_BATCH", 4))
+LOCAL_LLM_LATENCY_TOLERANCE = float(os.environ.get("LOCAL_LLM_LATENCY_TOLERANCE", 3))
+
+
+class QueueFull(Exception):
+  pass
+
+
+class _Waiter():
+  def __init__(self, priority, short):
+    self.priority = priority
+    self.short = short
+    self.admitted = False
+    self.queued = time.monotonic()
+
+
+class LLMScheduler():
+  """Client-side admission control for a single LLM server.
+
+  At most `limit` slots are in flight; everything else waits in a bounded
+  priority queue where interactive requests go ahead of batch ones and ties
+  are served first come, first served. A queue already holding `max_queue`
+  requests turns new ones away with `QueueFull`.
+
+  `limit` adapts to observed latency, scaled by prompt size (AIMD): while
+  the server is saturated and responses come back within `tolerance` times
+  the best recent latency it grows by about one slot per round trip, and it
+  is cut by 30% (at most once per round trip) when responses slow down
+  past that or fail. Short prompts waiting
+  together are admitted as a group, each one counting against `limit`, so
+  a burst of small requests reaches the server's parallel decoder at once
+  instead of trickling through behind long ones.
+
+  Only requests made in this process are seen: the apps, `batch_analysis.py`
+  and `news_sweep.py` each run their own scheduler, so priorities and
+  `limit` do not hold across them.
+  """
+
+  def __init__(self, max_limit=LOCAL_LLM_MAX_CONCURRENCY, min_limit=1, initial_limit=2,
+               max_queue=LOCAL_LLM_MAX_QUEUE, queue_timeout=LOCAL_LLM_QUEUE_TIMEOUT,
+               short_prompt=LOCAL_LLM_SHORT_PROMPT, max_batch=LOCAL_LLM_BATCH,
+               tolerance=LOCAL_LLM_LATENCY_TOLERANCE, latency_target=None):
+    self.max_limit = max_limit
+    self.min_limit = min_limit
+    self.limit = float(min(max(initial_limit, min_limit), max_limit))
+    self.max_queue = max_queue
+    self.queue_timeout = queue_timeout
+    self.short_prompt = short_prompt
+    self.max_batch = max_batch
+    self.tolerance = tolerance
+    self.latency_target = latency_target
+    self.baseline = None
+    self._slots = 0
+    self._waiting = []
+    self._sequence = itertools.count()
+    self._last_decrease = 0.0
+    self._cond = threading.Condition()
+    self.completed = 0
+    self.failed = 0
+    self.rejected = 0
+    self.grouped = 0
+
+  def acquire(self, priority="interactive", size=0):
+    """Wait for a slot and return a ticket for `release`; raises `QueueFull` if the queue is full or the wait times out."""
+    waiter = _Waiter(PRIORITIES[priority], size <= self.short_prompt)
+    entry = (waiter.priority, next(self._sequence), waiter)
+    deadline = time.monotonic() + self.queue_timeout
+    with self._cond:
+      if len(self._waiting) >= self.max_queue:
+        self.rejected += 1
+        raise QueueFull("{} requests already waiting for the local LLM".format(len(self._waiting)))
+      heapq.heappush(self._waiting, entry)
+      self._dispatch()
+      while not waiter.admitted:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          self._waiting.remove(entry)
+          heapq.heapify(self._waiting)
+          self.rejected += 1
+          raise QueueFull("timed out after {:.0f}s waiting for the local LLM".format(self.queue_timeout))
+        self._cond.wait(remaining)
+      return waiter
+
+  def release(self, ticket, latency, ok=True, size=0):
+    """Free `ticket`'s slot after a request of `size` bytes took `latency` seconds."""
+    with self._cond:
+      self._slots -= 1
+      if ok:
+        self.completed += 1
+      else:
+        self.failed += 1
+      # Long prompts are expected to take longer, so compare latency per short-prompt-sized unit
+      self._adjust(latency / max(1.0, size / self.short_prompt), ok)
+      self._dispatch()
+
+  def _dispatch(self):
+    admitted = False
+    while self._waiting and self._slots < int(self.limit):
+      group = [heapq.heappop(self._waiting)[2]]
+      room = min(self.max_batch, int(self.limit) - self._slots)
+      if group[0].short and room > 1:
+        shorts = sorted(entry for entry in self._waiting if entry[2].short)[:room - 1]
+        if shorts:
+          self._waiting = [entry for entry in self._waiting if entry not in shorts]
+          heapq.heapify(self._waiting)
+          group += [entry[2] for entry in shorts]
+          self.grouped += len(shorts)
+      for waiter in group:
+        waiter.admitted = True
+      self._slots += len(group)
+      admitted = True
+    if admitted:
+      self._cond.notify_all()
+
+  def _adjust(self, latency, ok):
+    now = time.monotonic()
+    if ok:
+      # Best recent latency, drifting up slowly so it follows a server that got slower for good
+      self.baseline = latency if self.baseline is None else min(latency, self.baseline * 1.01)
+    target = self.latency_target or self.tolerance * (self.baseline or latency)
+    if not ok or latency > target:
+      if now - self._last_decrease > (self.baseline or latency):
+        self.limit = max(self.min_limit, self.limit * 0.7)
+        self._last_decrease = now
+    elif self._slots >= int(self.limit) - 1:
+      self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+  def stats(self):
+    with self._cond:
+      return {
+        "limit": self.limit,
+        "in_flight": self._slots,
+        "queued": len(self._waiting),
+        "completed": self.completed,
+        "failed": self.failed,
+        "rejected": self.rejected,
+        "grouped": self.grouped,
+        "baseline_seconds": self.baseline,
+      }
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+  """Response body passed through as it arrives; `release(ok)` runs once when it is closed."""
+
+  def __init__(self, stream, release):
+    self._stream = stream
+    self._release = release
+    self._ok = True
+
+  def __iter__(self):
+    try:
+      for chunk in self._stream:
+        yield chunk
+    except Exception:
+      self._ok = False
+      raise
+
+  def close(self):
+    try:
+      self._stream.close()
+    finally:
+      release, self._release = self._release, None
+      if release is not None:
+        release(self._ok)
+
+
+class ScheduledTransport(httpx.BaseTransport):
+  """httpx transport sending every request through `scheduler` at `priority`.
+
+  A request keeps its slot until its response is closed, so streamed
+  responses arrive token by token while still counting against the limit.
+
+  Requests the scheduler turns away get a local 429 with Retry-After, which
+  the OpenAI client already backs off and retries on.
+  """
+
+  def __init__(self, scheduler, priority="interactive", transport=None):
+    self.scheduler = scheduler
+    self.priority = priority
+    self._transport = transport or httpx.HTTPTransport()
+
+  def handle_request(self, request):
+    size = len(request.read())
+    try:
+      ticket = self.scheduler.acquire(self.priority, size)
+    except QueueFull as e:
+      return httpx.Response(429, headers={"retry-after": "2"}, json={"error": {"message": str(e)}}, request=request)
+    started = time.monotonic()
+    try:
+      response = self._transport.handle_request(request)
+    except Exception:
+      self.scheduler.release(ticket, time.monotonic() - started, False, size)
+      raise
+    status_ok = response.status_code < 500 and response.status_code != 429
+
+    def release(ok):
+      self.scheduler.release(ticket, time.monotonic() - started, status_ok and ok, size)
+
+    # Tokens stream through to the caller; the slot is held until the body is
+    # closed, so latency covers the whole generation
+    return httpx.Response(
+      response.status_code, headers=response.headers, extensions=response.extensions,
+      stream=_ReleasingStream(response.stream, release), request=request,
+    )
+
+  def close(self):
+    self._transport.close()
+
+
+local_scheduler = LLMScheduler()
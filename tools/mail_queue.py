@@ -0,0 +1,149 @@
+import atexit
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import Future
+from email.message import EmailMessage
+
+_STOP = object()
+
+
+class MailQueue():
+  """Outbound mail served by a background worker over one persistent SMTP connection.
+
+  `send` returns a Future right away. The worker collects messages for
+  `batch_window` seconds, sends identical messages as one transaction to all
+  their recipients, keeps the authenticated connection open between batches
+  (closing it after `idle_timeout`) and retries failed sends with
+  exponential backoff. Point it at a local stand-in such as
+  `python -m aiosmtpd -n -l localhost:8025` with SMTP_HOST=localhost,
+  SMTP_PORT=8025 and SMTP_SSL=0.
+  """
+
+  def __init__(self, host=None, port=None, use_ssl=None, username=None, password=None,
+               batch_window=1.0, idle_timeout=60, max_retries=5, backoff=1.0):
+    self.host = host or os.environ.get("SMTP_HOST", "smtp.gmail.com")
+    self.port = int(port or os.environ.get("SMTP_PORT", 465))
+    self.use_ssl = use_ssl if use_ssl is not None else os.environ.get("SMTP_SSL", "1") != "0"
+    self.username = username or os.environ.get("SMTP_USERNAME")
+    self.password = password or os.environ.get("SMTP_PASSWORD") or os.environ.get("PYTHON_GMAIL_KEY")
+    self.batch_window = batch_window
+    self.idle_timeout = idle_timeout
+    self.max_retries = max_retries
+    self.backoff = backoff
+    self.sent = 0
+    self.failed = 0
+    self._queue = queue.Queue()
+    self._smtp = None
+    self._worker = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+    self._worker.start()
+
+  def send(self, sender, recipients, subject, body):
+    future = Future()
+    self._queue.put((sender, tuple(recipients), subject, body, future))
+    return future
+
+  def close(self, timeout=30):
+    """Send what is queued, then stop the worker."""
+    if self._worker.is_alive():
+      self._queue.put(_STOP)
+      self._worker.join(timeout)
+
+  def _run(self):
+    while True:
+      try:
+        item = self._queue.get(timeout=self.idle_timeout)
+      except queue.Empty:
+        self._disconnect()
+        continue
+      if item is _STOP:
+        self._disconnect()
+        return
+      batch = [item]
+      deadline = time.monotonic() + self.batch_window
+      stop = False
+      while (remaining := deadline - time.monotonic()) > 0:
+        try:
+          item = self._queue.get(timeout=remaining)
+        except queue.Empty:
+          break
+        if item is _STOP:
+          stop = True
+          break
+        batch.append(item)
+      for group in self._group(batch):
+        self._deliver(*group)
+      if stop:
+        self._disconnect()
+        return
+
+  def _group(self, batch):
+    groups = {}
+    for sender, recipients, subject, body, future in batch:
+      key = (sender, subject, body)
+      if key not in groups:
+        groups[key] = ([], [])
+      groups[key][0].extend(r for r in recipients if r not in groups[key][0])
+      groups[key][1].append(future)
+    return [(sender, recipients, subject, body, futures)
+            for (sender, subject, body), (recipients, futures) in groups.items()]
+
+  def _deliver(self, sender, recipients, subject, body, futures):
+    em = EmailMessage()
+    em['From'] = sender
+    em['To'] = ", ".join(recipients)
+    em['Subject'] = subject
+    em.set_content(body)
+
+    for attempt in range(self.max_retries + 1):
+      try:
+        self._connection().sendmail(sender, recipients, em.as_string())
+      except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPResponseException, OSError) as e:
+        self._disconnect()
+        if attempt == self.max_retries or (isinstance(e, smtplib.SMTPResponseException) and 500 <= e.smtp_code < 600):
+          self.failed += len(futures)
+          for future in futures:
+            future.set_exception(e)
+          return
+        time.sleep(self.backoff * 2 ** attempt)
+      else:
+        self.sent += len(futures)
+        for future in futures:
+          future.set_result(recipients)
+        return
+
+  def _connection(self):
+    if self._smtp is None:
+      if self.use_ssl:
+        smtp = smtplib.SMTP_SSL(self.host, self.port, context=ssl.create_default_context(), timeout=60)
+      else:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=60)
+      if self.username and self.password:
+        smtp.login(self.username, self.password)
+      self._smtp = smtp
+    return self._smtp
+
+  def _disconnect(self):
+    if self._smtp is not None:
+      try:
+        self._smtp.quit()
+      except (smtplib.SMTPException, OSError):
+        pass
+      self._smtp = None
+
+
+_mail_queue = None
+_lock = threading.Lock()
+
+
+def get_mail_queue():
+  """The process-wide mail queue, started on first use and flushed at exit."""
+  global _mail_queue
+  with _lock:
+    if _mail_queue is None:
+      _mail_queue = MailQueue()
+      atexit.register(_mail_queue.close)
+    return _mail_queue
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from langchain.tools import tool
+
+from tools.cache_paths import cache_dir
+from tools.crew_runner import report
+
+MARKET_CACHE_TTL = int(os.environ.get("MARKET_CACHE_TTL", 6 * 3600))
+
+TRADING_DAYS = 252
+
+FUNDAMENTALS = ["marketCap", "trailingPE", "forwardPE", "trailingEps", "forwardEps", "earningsGrowth", "debtToEquity"]
+
+# Whether a higher value ranks better among peers
+RANK_HIGHER_IS_BETTER = {
+  "return_3m": True,
+  "return_1y": True,
+  "volatility": False,
+  "max_drawdown": True,
+  "trailing_pe": False,
+  "eps_growth": True,
+}
+
+
+class MarketTools():
+  @tool("Market metrics for a stock and its peers")
+  def peer_metrics(data):
+    """
+    Useful to compare a stock with its industry peers on market data:
+    3 month and 1 year returns, volatility, max drawdown, P/E ratio and
+    EPS growth, plus each stock's rank among the peers (1 = best).
+    The input to this tool should be a pipe (|) separated text of
+    length two: the stock ticker and a comma separated list of peer
+    tickers. For example, `AAPL|MSFT,GOOGL,AMZN`.
+    """
+    stock, peers = (data.split("|") + [""])[:2]
+    tickers = [stock.strip().upper()] + [p.strip().upper() for p in peers.split(",") if p.strip()]
+    tickers = list(dict.fromkeys(tickers))
+    report('Computing market metrics for {}... '.format(", ".join(tickers)))
+    table = MarketTools.metrics(tickers)
+    ranks = MarketTools.ranks(table)
+    return "{}\n\nRanks among peers (1 = best)\n{}".format(
+      table.to_string(float_format=lambda v: "{:,.4g}".format(v)),
+      ranks.to_string(float_format=lambda v: "{:.0f}".format(v)),
+    )
+
+  def _cached_frame(name, tickers, load):
+    key = hashlib.sha256("{}|{}".format(name, ",".join(sorted(tickers))).encode("utf-8")).hexdigest()[:24]
+    path = os.path.join(cache_dir("market"), "{}-{}.parquet".format(name, key))
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < MARKET_CACHE_TTL:
+      return pd.read_parquet(path)
+    frame = load()
+    frame.to_parquet(path)
+    return frame
+
+  def prices(tickers, period="1y"):
+    """Adjusted closes for all `tickers` from a single bulk download, one column per ticker."""
+    def load():
+      close = yf.download(tickers, period=period, auto_adjust=True, progress=False, threads=True)["Close"]
+      if isinstance(close, pd.Series):
+        close = close.to_frame(tickers[0])
+      return close[[t for t in tickers if t in close.columns]]
+    return MarketTools._cached_frame("prices-" + period, tickers, load)
+
+  def fundamentals(tickers):
+    def load():
+      handles = yf.Tickers(" ".join(tickers)).tickers
+      with ThreadPoolExecutor(max_workers=min(8, len(tickers))) as executor:
+        infos = list(executor.map(lambda t: handles[t].info, tickers))
+      rows = [{field: info.get(field) for field in FUNDAMENTALS} for info in infos]
+      return pd.DataFrame(rows, index=tickers, dtype="float64")
+    return MarketTools._cached_frame("fundamentals", tickers, load)
+
+  def metrics(tickers):
+    close = MarketTools.prices(tickers)
+    returns = close.pct_change(fill_method=None)
+    last = close.ffill().iloc[-1]
+    table = pd.DataFrame({
+      "return_3m": last / close.ffill().iloc[-min(63, len(close))] - 1,
+      "return_1y": last / close.bfill().iloc[0] - 1,
+      "volatility": returns.std() * np.sqrt(TRADING_DAYS),
+      "max_drawdown": (close / close.cummax() - 1).min(),
+    })
+    fundamentals = MarketTools.fundamentals(tickers)
+    table["trailing_pe"] = fundamentals["trailingPE"]
+    table["eps_growth"] = fundamentals["forwardEps"] / fundamentals["trailingEps"] - 1
+    table["earnings_growth_yoy"] = fundamentals["earningsGrowth"]
+    table["debt_to_equity"] = fundamentals["debtToEquity"] / 100
+    table["market_cap_bn"] = fundamentals["marketCap"] / 1e9
+    return table.reindex(tickers)
+
+  def ranks(table):
+    columns = list(RANK_HIGHER_IS_BETTER)
+    ascending = [not RANK_HIGHER_IS_BETTER[c] for c in columns]
+    return pd.concat(
+      [table[c].rank(ascending=a, method="min") for c, a in zip(columns, ascending)], axis=1
+    )
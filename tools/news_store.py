@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from tools.cache_paths import cache_dir
+
+# Search topics run for every industry, see fetch_news
+NEWS_TOPICS = ["fraud", "bankruptcy", "restatement", "audit risk"]
+
+# Search terms per industry; industries sharing a term (Banking and Financial
+# Services both cover banks) share its queries, so a sweep fetches them once
+INDUSTRY_TERMS = {
+  "Financial Services": ["financial services", "bank"],
+  "Banking": ["bank"],
+  "Pharmaceuticals": ["pharmaceutical"],
+  "Biotech": ["biotech", "pharmaceutical"],
+  "Health Care": ["health care"],
+}
+
+MAX_AGE_DAYS = 90
+
+# SimHash fingerprints this many bits apart or fewer are the same story. Loose
+# compared to full documents since only a headline and snippet are hashed.
+NEAR_DUPLICATE_BITS = 10
+
+MASK = (1 << 64) - 1
+
+
+def _tokens(text):
+  return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def simhash(text, bits=64):
+  """64-bit SimHash over words; syndicated copies of a story land a few bits apart."""
+  weights = [0] * bits
+  for token in _tokens(text):
+    h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+    for bit in range(bits):
+      weights[bit] += 1 if h >> bit & 1 else -1
+  return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming(a, b):
+  return bin(a ^ b).count("1")
+
+
+def parse_date(value, now=None):
+  """Timestamp for Serper's `date` field ("3 hours ago", "Jan 5, 2024"), or None."""
+  now = now or datetime.now()
+  if not value:
+    return None
+  match = re.match(r"(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago", value.strip(), re.I)
+  if match:
+    days = {"minute": 1 / 1440, "hour": 1 / 24, "day": 1, "week": 7, "month": 30, "year": 365}
+    return (now - timedelta(days=int(match.group(1)) * days[match.group(2).lower()])).timestamp()
+  for fmt in ("%b %d, %Y", "%d %b %Y", "%B %d, %Y", "%Y-%m-%d"):
+    try:
+      return datetime.strptime(value.strip(), fmt).timestamp()
+    except ValueError:
+      pass
+  return None
+
+
+def _signed(value):
+  # SQLite integers are signed 64-bit
+  return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class NewsStore():
+  """Articles already reported per industry, keyed by URL and SimHash, with a high-water mark per industry.
+
+  Industries are tracked independently, so a story reported for Banking is
+  still new to Financial Services.
+  """
+
+  def __init__(self, path=None):
+    self.path = path or os.path.join(cache_dir("news"), "articles.sqlite")
+    self._local = threading.local()
+    with self._db() as db:
+      columns = {name: pk for _, name, _, _, _, pk in db.execute("PRAGMA table_info(articles)")}
+      if columns and not columns.get("industry"):
+        # Stores written before articles were keyed per industry
+        db.execute("ALTER TABLE articles RENAME TO articles_by_url")
+      db.execute("""CREATE TABLE IF NOT EXISTS articles (
+        url TEXT, industry TEXT, title TEXT, published REAL, simhash INTEGER, seen REAL,
+        PRIMARY KEY (industry, url))""")
+      if columns and not columns.get("industry"):
+        db.execute("INSERT OR IGNORE INTO articles SELECT * FROM articles_by_url")
+        db.execute("DROP TABLE articles_by_url")
+      db.execute("CREATE TABLE IF NOT EXISTS watermarks (industry TEXT PRIMARY KEY, published REAL)")
+
+  def _db(self):
+    db = getattr(self._local, "db", None)
+    if db is None:
+      db = self._local.db = sqlite3.connect(self.path, timeout=30)
+      db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+  def watermark(self, industry):
+    row = self._db().execute("SELECT published FROM watermarks WHERE industry = ?", (industry,)).fetchone()
+    return row[0] if row else None
+
+  def filter_new(self, industry, articles):
+    """Articles not reported before, newer than the industry's watermark, near-duplicates collapsed.
+
+    A collapsed copy's link is kept on the surviving article under `also`.
+    """
+    now = time.time()
+    oldest = max(self.watermark(industry) or 0, now - MAX_AGE_DAYS * 86400)
+    db = self._db()
+    known = [h & MASK for (h,) in db.execute(
+      "SELECT simhash FROM articles WHERE industry = ? AND seen > ?", (industry, now - MAX_AGE_DAYS * 86400))]
+
+    fresh = []
+    for article in articles:
+      if not article.get("link"):
+        continue
+      if db.execute("SELECT 1 FROM articles WHERE industry = ? AND url = ?", (industry, article["link"])).fetchone():
+        continue
+      published = parse_date(article.get("date"))
+      if published is not None and published <= oldest:
+        continue
+      fingerprint = simhash("{} {}".format(article.get("title", ""), article.get("snippet", "")))
+      if any(hamming(fingerprint, h) <= NEAR_DUPLICATE_BITS for h in known):
+        continue
+      duplicate = next((a for a in fresh if hamming(a["simhash"], fingerprint) <= NEAR_DUPLICATE_BITS), None)
+      if duplicate is not None:
+        duplicate.setdefault("also", []).append(article["link"])
+        continue
+      fresh.append(dict(article, published=published, simhash=fingerprint))
+    return fresh
+
+  def commit(self, industry, articles):
+    """Record `articles` as reported and advance the industry's watermark."""
+    now = time.time()
+    with self._db() as db:
+      db.executemany(
+        "INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?)",
+        [(a["link"], industry, a.get("title"), a.get("published"), _signed(a["simhash"]), now) for a in articles],
+      )
+      published = [a["published"] for a in articles if a.get("published")]
+      if published:
+        db.execute(
+          "INSERT INTO watermarks VALUES (?, ?) ON CONFLICT(industry) DO UPDATE SET published = max(published, excluded.published)",
+          (industry, max(published)),
+        )
+
+
+def news_queries(industry):
+  terms = INDUSTRY_TERMS.get(industry, [industry.lower()])
+  return ["{} {}".format(term, topic) for term in terms for topic in NEWS_TOPICS]
+
+
+def fetch_news(industry, fetch=None):
+  """News results for every topic query of `industry`.
+
+  `fetch(query)` returns a list of Serper news results; by default it goes
+  through the shared search cache.
+  """
+  if fetch is None:
+    from tools.search_tools import SearchTools
+    fetch = lambda query: SearchTools.serper("news", query).get("news", [])
+  articles = {}
+  for query in news_queries(industry):
+    for article in fetch(query):
+      articles.setdefault(article.get("link"), article)
+  return list(articles.values())
+
+
+def format_articles(articles):
+  lines = []
+  for article in articles:
+    lines.append("Title: {}\nLink: {}\nDate: {}\nSnippet: {}".format(
+      article.get("title"), article.get("link"), article.get("date"), article.get("snippet")))
+    if article.get("also"):
+      lines.append("Also reported at: " + ", ".join(article["also"]))
+    lines.append("-----------------")
+  return "\n".join(lines)
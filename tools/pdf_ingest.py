@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from langchain.text_splitter import CharacterTextSplitter
+from langchain.tools import tool
+from langchain_community.vectorstores import FAISS
+
+from tools.embedding_pipeline import get_embeddings
+from tools.pdf_pages import extract_pages, page_count
+
+# Pages handed to an extraction worker at a time, and the number of worker processes
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", 8))
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+_splitter = CharacterTextSplitter(
+  separator="\n",
+  chunk_size=1000,
+  chunk_overlap=150,
+  length_function=len,
+  is_separator_regex=False,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _extract_pool():
+  global _pool
+  with _pool_lock:
+    if _pool is None:
+      # Spawned workers: forking a process that runs Streamlit's threads isn't safe
+      _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+class PDFIngestion():
+  """Indexes one PDF in a background thread, a batch of pages at a time.
+
+  Pages are extracted in parallel by worker processes, and every batch is
+  embedded and added to the FAISS index as soon as it arrives, so `search`
+  answers from the pages indexed so far while the rest is still being
+  processed. The finished index is saved to `index_dir` and loaded from
+  there the next time the same document is ingested.
+  """
+
+  def __init__(self, name, path, index_dir, embeddings=None):
+    self.name = name
+    self.path = path
+    self.index_dir = index_dir
+    self.embeddings = embeddings or get_embeddings()
+    self.pages_total = None
+    self.pages_indexed = 0
+    self.error = None
+    self.cancelled = False
+    self._store = None
+    self._lock = threading.Lock()
+    self._done = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="pdf-ingest", daemon=True)
+
+  def start(self):
+    self._thread.start()
+    return self
+
+  @property
+  def done(self):
+    return self._done.is_set()
+
+  def wait(self, timeout=None):
+    return self._done.wait(timeout)
+
+  def progress(self):
+    """Fraction of pages indexed, 0 until the page count is known."""
+    if not self.pages_total:
+      return 1.0 if self.done else 0.0
+    return self.pages_indexed / self.pages_total
+
+  def _run(self):
+    try:
+      self.pages_total = page_count(self.path)
+      if os.path.exists(os.path.join(self.index_dir, "index.faiss")):
+        store = FAISS.load_local(self.index_dir, self.embeddings, allow_dangerous_deserialization=True)
+        with self._lock:
+          self._store = store
+          self.pages_indexed = self.pages_total
+        return
+
+      pool = _extract_pool()
+      futures = [
+        pool.submit(extract_pages, self.path, start, min(start + PDF_PAGES_PER_TASK, self.pages_total))
+        for start in range(0, self.pages_total, PDF_PAGES_PER_TASK)
+      ]
+      for future in as_completed(futures):
+        if self.cancelled:
+          for pending in futures:
+            pending.cancel()
+          return
+        self._add(future.result())
+      self._save()
+    except Exception as e:
+      self.error = e
+    finally:
+      self._done.set()
+
+  def _add(self, pages):
+    documents = _splitter.create_documents(
+      [text for _, text in pages],
+      metadatas=[{"source": self.name, "page": number + 1} for number, _ in pages],
+    )
+    if documents:
+      # Embed outside the lock so searches keep running against the pages already indexed
+      texts = [document.page_content for document in documents]
+      pairs = list(zip(texts, self.embeddings.embed_documents(texts)))
+      metadatas = [document.metadata for document in documents]
+      with self._lock:
+        if self._store is None:
+          self._store = FAISS.from_embeddings(pairs, self.embeddings, metadatas=metadatas)
+        else:
+          self._store.add_embeddings(pairs, metadatas=metadatas)
+    with self._lock:
+      self.pages_indexed += len(pages)
+
+  def _save(self):
+    with self._lock:
+      if self._store is None or self.cancelled:
+        return
+      tmp = "{}.tmp-{}".format(self.index_dir, os.getpid())
+      self._store.save_local(tmp)
+    shutil.rmtree(self.index_dir, ignore_errors=True)
+    os.replace(tmp, self.index_dir)
+
+  def search(self, query, k=4, vector=None):
+    """(document, distance) pairs for `query` from the pages indexed so far."""
+    vector = vector or self.embeddings.embed_query(query)
+    with self._lock:
+      if self._store is None:
+        return []
+      return self._store.similarity_search_with_score_by_vector(vector, k=k)
+
+
+def document_search_tool(ingestions, k=4):
+  """A search tool over `ingestions` that answers from whatever pages are indexed so far."""
+
+  @tool("Search the uploaded documents")
+  def search_documents(query):
+    """Useful to search the uploaded PDF documents for passages
+    relevant to a question. The input should be the question or
+    the keywords to look up."""
+    if not ingestions:
+      return "No documents have been uploaded."
+    vector = ingestions[0].embeddings.embed_query(query)
+    results = []
+    for ingestion in ingestions:
+      results.extend(ingestion.search(query, k=k, vector=vector))
+    results.sort(key=lambda result: result[1])
+    passages = [
+      "[{} p.{}]\n{}".format(document.metadata["source"], document.metadata["page"], document.page_content)
+      for document, _ in results[:k]
+    ]
+    pending = [
+      "{} ({} of {} pages indexed)".format(ingestion.name, ingestion.pages_indexed, ingestion.pages_total or "?")
+      for ingestion in ingestions if not ingestion.done
+    ]
+    if pending:
+      passages.append("Still indexing: " + ", ".join(pending) + ". Search again later for the remaining pages.")
+    return "\n\n-----------------\n\n".join(passages) or "No matching passages found."
+
+  return search_documents
@@ -0,0 +1,13 @@
+from pypdf import PdfReader
+
+
+# Kept free of heavy imports: spawned extraction workers only load this module.
+
+def page_count(path):
+  return len(PdfReader(path).pages)
+
+
+def extract_pages(path, start, stop):
+  """Text of pages `start` to `stop` (exclusive) of the PDF at `path`, as (page number, text) pairs."""
+  reader = PdfReader(path)
+  return [(number, reader.pages[number].extract_text() or "") for number in range(start, stop)]
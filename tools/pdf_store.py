@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Bytes read from an upload and written to disk at a time
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+class PDFStore():
+  """Uploaded PDFs and their vector indexes, stored by content hash.
+
+  Each document lives in `<path>/<sha256>/` as `document.pdf`, its FAISS
+  index under `faiss/` (see `tools.pdf_ingest`), and `meta.json` with the
+  names it was uploaded under. Uploading the same bytes again, under any
+  name, reuses the entry and its index. Entries are evicted least recently
+  used first once the store grows past `max_bytes`.
+  """
+
+  def __init__(self, path=None, max_bytes=None):
+    self.path = path or os.environ.get("PDF_STORE_DIR", "test_data")
+    self.max_bytes = max_bytes or int(os.environ.get("PDF_STORE_MAX_BYTES", 1024 ** 3))
+    self._ingestions = {}
+    self._lock = threading.Lock()
+    os.makedirs(self.path, exist_ok=True)
+
+  def _entry(self, digest):
+    return os.path.join(self.path, digest)
+
+  def pdf_path(self, digest):
+    return os.path.join(self._entry(digest), "document.pdf")
+
+  def add(self, name, upload):
+    """Save the file-like `upload` if it isn't stored yet and return its hash.
+
+    The upload is copied to disk and hashed in chunks, so large files are
+    never held in memory twice.
+    """
+    digest = hashlib.sha256()
+    tmp = os.path.join(self.path, ".upload-{}-{}.tmp".format(os.getpid(), threading.get_ident()))
+    with open(tmp, "wb") as f:
+      while chunk := upload.read(WRITE_CHUNK_SIZE):
+        digest.update(chunk)
+        f.write(chunk)
+    digest = digest.hexdigest()
+    os.makedirs(self._entry(digest), exist_ok=True)
+    if os.path.exists(self.pdf_path(digest)):
+      os.remove(tmp)
+    else:
+      os.replace(tmp, self.pdf_path(digest))
+    self._remember(digest, name)
+    self.enforce_limit(keep=digest)
+    return digest
+
+  def _remember(self, digest, name):
+    meta = self._meta(digest)
+    if name not in meta["names"]:
+      meta["names"].append(name)
+    self._touch(digest, meta)
+
+  def _touch(self, digest, meta=None):
+    meta = meta or self._meta(digest)
+    meta["last_used"] = time.time()
+    with open(os.path.join(self._entry(digest), "meta.json"), "w") as f:
+      json.dump(meta, f)
+
+  def _meta(self, digest):
+    try:
+      with open(os.path.join(self._entry(digest), "meta.json")) as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {"names": [], "last_used": 0}
+
+  def ingest(self, digest):
+    """The running (or finished) `PDFIngestion` of a stored document, started on first call."""
+    # Loads langchain and FAISS, so the store itself stays cheap to import
+    from tools.pdf_ingest import PDFIngestion
+
+    with self._lock:
+      if digest not in self._ingestions:
+        name = (self._meta(digest)["names"] or [digest[:12]])[0]
+        self._ingestions[digest] = PDFIngestion(name, self.pdf_path(digest), os.path.join(self._entry(digest), "faiss")).start()
+    self._touch(digest)
+    return self._ingestions[digest]
+
+  def entries(self):
+    """Stored documents, most recently used first."""
+    entries = []
+    for digest in os.listdir(self.path):
+      if not os.path.exists(self.pdf_path(digest)):
+        continue
+      meta = self._meta(digest)
+      entries.append({
+        "digest": digest,
+        "names": meta["names"],
+        "bytes": self._size(self._entry(digest)),
+        "indexed": os.path.isdir(os.path.join(self._entry(digest), "faiss")),
+        "last_used": meta["last_used"],
+      })
+    return sorted(entries, key=lambda e: e["last_used"], reverse=True)
+
+  def _size(self, path):
+    total = 0
+    for root, _, files in os.walk(path):
+      for name in files:
+        try:
+          total += os.path.getsize(os.path.join(root, name))
+        except OSError:
+          pass
+    return total
+
+  def evict(self, digest):
+    with self._lock:
+      ingestion = self._ingestions.pop(digest, None)
+    if ingestion is not None:
+      ingestion.cancelled = True
+    shutil.rmtree(self._entry(digest), ignore_errors=True)
+
+  def enforce_limit(self, keep=None):
+    """Evict least recently used documents until the store fits in `max_bytes`."""
+    entries = self.entries()
+    total = sum(e["bytes"] for e in entries)
+    for entry in reversed(entries):
+      if total <= self.max_bytes:
+        break
+      if entry["digest"] == keep:
+        continue
+      self.evict(entry["digest"])
+      total -= entry["bytes"]
+
+
+pdf_store = PDFStore()
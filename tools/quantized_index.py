@@ -0,0 +1,98 @@
+import math
+import uuid
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+INDEX_TYPES = ("flat", "sq8", "ivfpq")
+
+# Fewer chunks than this don't save enough memory to be worth an IVF/PQ index
+MIN_IVFPQ_VECTORS = 1000
+
+
+def build_index(vectors, index_type="flat", recall_target=0.95):
+  """Build a FAISS index of `index_type` over `vectors` (float32, one row per chunk).
+
+  Compressed indexes are checked against exact search on a sample of the
+  vectors. IVF/PQ adds sub-quantizers and then raises `nprobe` until
+  recall@4 reaches `recall_target`; an index that can't reach it falls
+  back to the next larger one (ivfpq -> sq8 -> flat).
+  """
+  d = vectors.shape[1]
+  flat = faiss.IndexFlatL2(d)
+  flat.add(vectors)
+  if index_type == "flat":
+    return flat
+  queries = _sample(vectors)
+  _, truth = flat.search(queries, 4)
+
+  if index_type == "ivfpq" and len(vectors) >= MIN_IVFPQ_VECTORS:
+    index = _build_ivfpq(vectors, queries, truth, recall_target)
+    if index is not None:
+      return index
+
+  index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+  index.train(vectors)
+  index.add(vectors)
+  if recall_at_k(index, queries, truth) >= recall_target:
+    return index
+  return flat
+
+
+def _build_ivfpq(vectors, queries, truth, recall_target):
+  # Most compressed first: try more PQ sub-quantizers only when recall needs it
+  n, d = vectors.shape
+  nlist = max(1, int(math.sqrt(n)))
+  nbits = max(4, min(8, int(math.log2(n / 39))))
+  for m in dict.fromkeys(m for m in (d // 24, d // 12, d // 8, d // 4) if m and d % m == 0):
+    index = faiss.IndexIVFPQ(faiss.IndexFlatL2(d), d, nlist, m, nbits)
+    index.train(vectors)
+    index.add(vectors)
+    index.nprobe = nlist
+    if recall_at_k(index, queries, truth) < recall_target:
+      continue
+    nprobe = 1
+    while nprobe < nlist:
+      index.nprobe = nprobe
+      if recall_at_k(index, queries, truth) >= recall_target:
+        break
+      nprobe *= 2
+    index.nprobe = min(nprobe, nlist)
+    return index
+  return None
+
+
+def recall_at_k(index, queries, truth, k=4):
+  """Fraction of the exact top-`k` neighbours that `index` also returns."""
+  _, found = index.search(queries, k)
+  hits = sum(len(set(f) & set(t)) for f, t in zip(found.tolist(), truth[:, :k].tolist()))
+  return hits / truth[:, :k].size
+
+
+def index_bytes(index):
+  return len(faiss.serialize_index(index))
+
+
+def _sample(vectors, size=200, seed=0):
+  rng = np.random.default_rng(seed)
+  rows = rng.choice(len(vectors), size=min(size, len(vectors)), replace=False)
+  # Perturb the samples so queries aren't exact copies of indexed vectors
+  noise = rng.normal(scale=vectors.std() * 0.1, size=(len(rows), vectors.shape[1]))
+  return (vectors[rows] + noise).astype("float32")
+
+
+def build_store(documents, embeddings, index_type="flat", recall_target=0.95):
+  """LangChain FAISS store over `documents` backed by an index of `index_type`."""
+  if index_type == "flat":
+    return FAISS.from_documents(documents, embeddings)
+  vectors = np.asarray(embeddings.embed_documents([d.page_content for d in documents]), dtype="float32")
+  index = build_index(vectors, index_type, recall_target)
+  ids = [str(uuid.uuid4()) for _ in documents]
+  return FAISS(
+    embeddings,
+    index,
+    InMemoryDocstore(dict(zip(ids, documents))),
+    dict(enumerate(ids)),
+  )
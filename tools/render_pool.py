@@ -0,0 +1,111 @@
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml import etree, html as lxml_html
+import pyppeteer
+from requests_html import HTML, HTMLSession
+
+from tools.ttl_cache import TTLCache
+
+
+class RenderPool():
+  """Long-lived pool of headless Chromium sessions with a rendered-DOM cache.
+
+  Each worker thread owns one `HTMLSession` with its browser already
+  launched, so renders skip the Chromium start-up cost after the first call.
+  Pages whose static HTML already carries `min_static_chars` of text are
+  returned without rendering at all.
+  """
+
+  def __init__(self, size=None, ttl=None, min_static_chars=None):
+    self.size = size or int(os.environ.get("RENDER_POOL_SIZE", 2))
+    self.min_static_chars = min_static_chars or int(os.environ.get("STATIC_TEXT_MIN_CHARS", 2000))
+    self.cache = TTLCache(maxsize=256, ttl=ttl or int(os.environ.get("RENDER_CACHE_TTL", 900)))
+    self.static_hits = 0
+    self.renders = 0
+    self._local = threading.local()
+    self._sessions = []
+    self._lock = threading.Lock()
+    self._executor = None
+
+  def render(self, url, html):
+    """Return the DOM for `url`, rendering `html` with JavaScript only when needed."""
+    cached = self.cache.get(url)
+    if cached is not None:
+      return cached
+    if len(self._visible_text(html)) >= self.min_static_chars:
+      with self._lock:
+        self.static_hits += 1
+      result = html
+    else:
+      result = self._pool().submit(self._render, url, html).result()
+      with self._lock:
+        self.renders += 1
+    self.cache.set(url, result)
+    return result
+
+  def _visible_text(self, html):
+    try:
+      root = lxml_html.fromstring(html)
+    except (etree.ParserError, ValueError):
+      return ""
+    for element in root.xpath("//script|//style|//noscript"):
+      element.drop_tree()
+    return " ".join(root.text_content().split())
+
+  def _pool(self):
+    with self._lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(
+          max_workers=self.size,
+          thread_name_prefix="render",
+          initializer=self._start_session,
+        )
+      return self._executor
+
+  def _start_session(self):
+    # pyppeteer installs signal handlers by default, which only works on the
+    # main thread, so launch the browser here and hand it to the session.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    session = HTMLSession()
+    session.loop = loop
+    session._browser = loop.run_until_complete(pyppeteer.launch(
+      headless=True,
+      args=["--no-sandbox"],
+      handleSIGINT=False,
+      handleSIGTERM=False,
+      handleSIGHUP=False,
+    ))
+    self._local.session = session
+    with self._lock:
+      self._sessions.append(session)
+
+  def _render(self, url, html):
+    page = HTML(session=self._local.session, url=url, html=html)
+    page.render()
+    return page.html
+
+  def close(self):
+    with self._lock:
+      executor, self._executor = self._executor, None
+      sessions, self._sessions = self._sessions, []
+    if executor is not None:
+      executor.shutdown(wait=True)
+    for session in sessions:
+      session.close()
+
+  def stats(self):
+    return {
+      "cache_hits": self.cache.hits,
+      "static_hits": self.static_hits,
+      "renders": self.renders,
+      "warm_sessions": len(self._sessions),
+    }
+
+
+render_pool = RenderPool()
+atexit.register(render_pool.close)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from tools.cache_paths import cache_dir
+from tools.ttl_cache import TTLCache
+
+
+class ResponseCache():
+  """Two-level (memory, then disk) LRU/TTL cache that coalesces in-flight fetches.
+
+  Concurrent callers asking for a key that is already being fetched wait on
+  the first request instead of sending their own. Each entry remembers how
+  long its original fetch took, which is what a hit is counted as saving.
+  """
+
+  def __init__(self, name, ttl=3600, maxsize=512, max_disk_entries=5000):
+    self.name = name
+    self.ttl = ttl
+    self.max_disk_entries = max_disk_entries
+    self.path = cache_dir(name)
+    self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+    self._inflight = {}
+    self._lock = threading.Lock()
+    self.reset_stats()
+
+  def reset_stats(self):
+    self.hits = 0
+    self.misses = 0
+    self.coalesced = 0
+    self.saved_seconds = 0.0
+
+  def _disk_path(self, key):
+    return os.path.join(self.path, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+  def _read_disk(self, key):
+    try:
+      with open(self._disk_path(key)) as f:
+        entry = json.load(f)
+    except (OSError, ValueError):
+      return None
+    if entry["expires"] < time.time():
+      return None
+    os.utime(self._disk_path(key))
+    return entry
+
+  def _write_disk(self, key, entry):
+    path = self._disk_path(key)
+    tmp = "{}.tmp-{}-{}".format(path, os.getpid(), threading.get_ident())
+    with open(tmp, "w") as f:
+      json.dump(entry, f)
+    os.replace(tmp, path)
+    self._prune_disk()
+
+  def _prune_disk(self):
+    files = [os.path.join(self.path, f) for f in os.listdir(self.path) if f.endswith(".json")]
+    if len(files) <= self.max_disk_entries:
+      return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - self.max_disk_entries]:
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+
+  def _record_hit(self, entry):
+    with self._lock:
+      self.hits += 1
+      self.saved_seconds += entry["latency"]
+
+  def get_or_fetch(self, key, fetch):
+    """Return the cached value for `key`, calling `fetch()` at most once across concurrent callers."""
+    entry = self.memory.get(key)
+    if entry is None:
+      entry = self._read_disk(key)
+      if entry is not None:
+        self.memory.set(key, entry, ttl=entry["expires"] - time.time())
+    if entry is not None:
+      self._record_hit(entry)
+      return entry["value"]
+
+    with self._lock:
+      future = self._inflight.get(key)
+      owner = future is None
+      if owner:
+        future = self._inflight[key] = Future()
+        self.misses += 1
+      else:
+        self.coalesced += 1
+    if not owner:
+      return future.result()
+
+    try:
+      started = time.monotonic()
+      value = fetch()
+      entry = {"expires": time.time() + self.ttl, "latency": time.monotonic() - started, "value": value}
+      self.memory.set(key, entry)
+      self._write_disk(key, entry)
+      future.set_result(value)
+      return value
+    except BaseException as e:
+      future.set_exception(e)
+      raise
+    finally:
+      with self._lock:
+        del self._inflight[key]
+
+  def stats(self):
+    with self._lock:
+      lookups = self.hits + self.misses + self.coalesced
+      return {
+        "hits": self.hits,
+        "misses": self.misses,
+        "coalesced": self.coalesced,
+        "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        "saved_seconds": self.saved_seconds,
+      }
+
+  def report(self):
+    stats = self.stats()
+    return "{} cache: {:.0%} hit rate ({} hits, {} coalesced, {} misses), {:.1f}s saved".format(
+      self.name, stats["hit_rate"], stats["hits"], stats["coalesced"], stats["misses"], stats["saved_seconds"]
+    )
@@ -1,9 +1,13 @@
 import json
 import os
 
-import requests
 from langchain.tools import tool
-import streamlit as st
+
+from tools.crew_runner import report
+from tools.http_cache import http_cache
+from tools.response_cache import ResponseCache
+
+search_cache = ResponseCache("serper", ttl=int(os.environ.get("SEARCH_CACHE_TTL", 3600)))
 
 
 class SearchTools():
@@ -12,14 +16,7 @@ class SearchTools():
     """Useful to search the internet 
     about a a given topic and return relevant results"""
     top_result_to_return = 4
-    url = "https://google.serper.dev/search"
-    payload = json.dumps({"q": query})
-    headers = {
-        'X-API-KEY': os.environ['SERPER_API_KEY'],
-        'content-type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
-    results = response.json()['organic']
+    results = SearchTools.serper("search", query)['organic']
     string = []
     for result in results[:top_result_to_return]:
       try:
@@ -30,7 +27,7 @@ class SearchTools():
       except KeyError:
         next
 
-    st.write('Searching the internet for {}... '.format(query))
+    report('Searching the internet for {}... '.format(query))
     return '\n'.join(string)
 
   @tool("Search news on the internet")
@@ -38,14 +35,7 @@ class SearchTools():
     """Useful to search news about a company, stock or any other
     topic and return relevant results"""""
     top_result_to_return = 4
-    url = "https://google.serper.dev/news"
-    payload = json.dumps({"q": query})
-    headers = {
-        'X-API-KEY': os.environ['SERPER_API_KEY'],
-        'content-type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
-    results = response.json()['news']
+    results = SearchTools.serper("news", query)['news']
     string = []
     for result in results[:top_result_to_return]:
       try:
@@ -56,5 +46,23 @@ class SearchTools():
       except KeyError:
         next
 
-    st.write('Searching the internet for news on {}... '.format(query))
-    return '\n'.join(string)
\ No newline at end of file
+    report('Searching the internet for news on {}... '.format(query))
+    return '\n'.join(string)
+
+  def serper(endpoint, query):
+    """POST `query` to a google.serper.dev endpoint, served from the shared cache when possible."""
+    query = " ".join(str(query).split())
+    key = "{}\n{}".format(endpoint, query.lower())
+
+    def fetch():
+      url = f"https://google.serper.dev/{endpoint}"
+      payload = json.dumps({"q": query})
+      headers = {
+          'X-API-KEY': os.environ['SERPER_API_KEY'],
+          'content-type': 'application/json'
+      }
+      response = http_cache.post(url, headers=headers, data=payload)
+      response.raise_for_status()
+      return response.json()
+
+    return search_cache.get_or_fetch(key, fetch)
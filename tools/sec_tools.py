@@ -1,15 +1,28 @@
+import gzip
+import hashlib
+import json
 import os
-
-import requests
+import re
 
 from langchain.tools import tool
 from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
 
-from sec_api import QueryApi
 from unstructured.partition.html import partition_html
-import streamlit as st
+
+from tools.bm25 import BM25Index, reciprocal_rank_fusion
+from tools.cache_paths import cache_dir
+from tools.crew_runner import report
+from tools.embedding_pipeline import get_embeddings
+from tools.filing_prefetch import filing_prefetcher
+from tools.filing_sections import route, split_sections
+from tools.http_cache import http_cache
+from tools.index_cache import index_cache
+from tools.ttl_cache import TTLCache
+
+# hybrid (BM25 + vectors), vector or lexical (BM25 only, no embedding calls)
+RETRIEVAL_MODE = os.environ.get("SEC_RETRIEVAL_MODE", "hybrid")
+
+_bm25_cache = TTLCache(maxsize=64, ttl=3600)
 
 class SECTools():
   @tool("Search 10-Q form")
@@ -21,26 +34,16 @@ class SECTools():
     length two, representing the stock ticker you are interested and what
     question you have from it.
 		For example, `AAPL|what was last quarter's revenue`.
+    Put the question in double quotes to look up an exact phrase,
+    like a line item name: `AAPL|"Total net sales"`.
     """
     stock, ask = data.split("|")
-    queryApi = QueryApi(api_key=os.environ['SEC_API_API_KEY'])
-    query = {
-      "query": {
-        "query_string": {
-          "query": f"ticker:{stock} AND formType:\"10-Q\""
-        }
-      },
-      "from": "0",
-      "size": "1",
-      "sort": [{ "filedAt": { "order": "desc" }}]
-    }
-
-    st.write('Searching for the latest 10-Q form for {}... '.format(stock))
-    fillings = queryApi.get_filings(query)['filings']
-    if len(fillings) == 0:
+    report('Searching for the latest 10-Q form for {}... '.format(stock))
+    link = filing_prefetcher.latest_filing(stock, "10-Q")
+    if link is None:
       return "Sorry, I couldn't find any filling for this stock, check if the ticker is correct."
-    link = fillings[0]['linkToFilingDetails']
-    answer = SECTools.__embedding_search(link, ask)
+    filing_prefetcher.wait(link)
+    answer = SECTools.__embedding_search(link, ask, "10-Q")
     return answer
 
   @tool("Search 10-K form")
@@ -52,32 +55,86 @@ class SECTools():
     length two, representing the stock ticker you are interested, what
     question you have from it.
     For example, `AAPL|what was last year's revenue`.
+    Put the question in double quotes to look up an exact phrase,
+    like a line item name: `AAPL|"Total net sales"`.
     """
     stock, ask = data.split("|")
-    queryApi = QueryApi(api_key=os.environ['SEC_API_API_KEY'])
-    query = {
-      "query": {
-        "query_string": {
-          "query": f"ticker:{stock} AND formType:\"10-K\""
-        }
-      },
-      "from": "0",
-      "size": "1",
-      "sort": [{ "filedAt": { "order": "desc" }}]
-    }
-
-    st.write('Searching for the latest 10-K form for {}... '.format(data))
-    fillings = queryApi.get_filings(query)['filings']
-    if len(fillings) == 0:
+    report('Searching for the latest 10-K form for {}... '.format(data))
+    link = filing_prefetcher.latest_filing(stock, "10-K")
+    if link is None:
       return "Sorry, I couldn't find any filling for this stock, check if the ticker is correct."
-    link = fillings[0]['linkToFilingDetails']
-    answer = SECTools.__embedding_search(link, ask)
+    filing_prefetcher.wait(link)
+    answer = SECTools.__embedding_search(link, ask, "10-K")
     return answer
 
-  def __embedding_search(url, ask):
+  def __embedding_search(url, ask, form):
+    filing = SECTools.__parse_filing(url, form)
+
+    # Only the Items the question routes to get indexed, each on its own
+    sections = [key for key in route(ask, form) if key in filing["sections"]]
+    sources = [("{}#item-{}".format(url, key), filing["sections"][key]) for key in sections]
+    sources = sources or [(url, filing["content"])]
+
+    # A question wrapped in quotes is an exact lookup (e.g. a line-item name)
+    mode = "lexical" if re.fullmatch(r'\s*"[^"]+"\s*', ask) else RETRIEVAL_MODE
+    rankings = []
+    if mode != "vector":
+      results = []
+      for source, text in sources:
+        results += SECTools.__bm25(source, text).search(ask, k=8)
+      rankings.append([doc for doc, score in sorted(results, key=lambda r: r[1], reverse=True)])
+    if mode != "lexical":
+      embeddings = get_embeddings()
+      vector = embeddings.embed_query(ask)
+      results = []
+      for source, text in sources:
+        store = index_cache.get_or_build(source, embeddings, lambda text=text: SECTools.__split(text))
+        results += store.similarity_search_with_score_by_vector(vector, k=8)
+      rankings.append([doc for doc, score in sorted(results, key=lambda r: r[1])])
+    answers = reciprocal_rank_fusion(rankings)[:4]
+    answers = "\n\n".join([a.page_content for a in answers])
+    report('Searching local memory for {}... '.format(ask))
+    return answers
+
+  def __bm25(source, text):
+    index = _bm25_cache.get(source)
+    if index is None:
+      index = BM25Index(SECTools.__split(text))
+      _bm25_cache.set(source, index)
+    return index
+
+  def warm_filing(url, form, sections):
+    """Download and parse a filing and build the indexes for `sections` ahead of any question."""
+    filing = SECTools.__parse_filing(url, form)
+    embeddings = get_embeddings()
+    for key in sections:
+      if key in filing["sections"]:
+        index_cache.get_or_build(
+          "{}#item-{}".format(url, key), embeddings,
+          lambda key=key: SECTools.__split(filing["sections"][key])
+        )
+
+  def filing_chunks(url, form="10-K"):
+    """The whole filing split into the chunks that get indexed."""
+    return SECTools.__split(SECTools.__parse_filing(url, form)["content"])
+
+  def __parse_filing(url, form):
+    """Filing text and its Items, partitioned once and kept on disk."""
+    path = os.path.join(cache_dir("filings"), hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json.gz")
+    if os.path.exists(path):
+      with gzip.open(path, "rt") as f:
+        return json.load(f)
     text = SECTools.__download_form_html(url)
     elements = partition_html(text=text)
     content = "\n".join([str(el) for el in elements])
+    filing = {"content": content, "sections": split_sections(content, form)}
+    tmp = "{}.tmp-{}".format(path, os.getpid())
+    with gzip.open(tmp, "wt") as f:
+      json.dump(filing, f)
+    os.replace(tmp, path)
+    return filing
+
+  def __split(content):
     text_splitter = CharacterTextSplitter(
         separator = "\n",
         chunk_size = 1000,
@@ -85,14 +142,11 @@ class SECTools():
         length_function = len,
         is_separator_regex = False,
     )
-    docs = text_splitter.create_documents([content])
-    retriever = FAISS.from_documents(
-      docs, OpenAIEmbeddings()
-    ).as_retriever()
-    answers = retriever.get_relevant_documents(ask, top_k=4)
-    answers = "\n\n".join([a.page_content for a in answers])
-    st.write('Searching local memory for {}... '.format(ask))
-    return answers
+    return text_splitter.create_documents([content])
+
+  def index_cache_stats():
+    """Hit/miss counters and size of the persistent filing index cache."""
+    return index_cache.stats()
 
   def __download_form_html(url):
     headers = {
@@ -112,6 +166,5 @@ class SECTools():
       'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
     }
 
-    st.write('Saving to local memory - {}... '.format(url))
-    response = requests.get(url, headers=headers)
-    return response.text
\ No newline at end of file
+    report('Saving to local memory - {}... '.format(url))
+    return http_cache.get(url, headers=headers)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import time
+
+
+class TaskTimer():
+  """Records when each crew task finishes and derives the critical path.
+
+  A task is assumed to start once all of its dependencies have finished
+  (or when the crew starts, if it has none), which is how crewAI schedules
+  async tasks and tasks with `context`.
+  """
+
+  def __init__(self):
+    self.started = None
+    self.finished = {}
+    self.depends_on = {}
+
+  def track(self, name, task, depends_on=()):
+    self.depends_on[name] = list(depends_on)
+    task.callback = lambda output: self._finish(name)
+    return task
+
+  def start(self):
+    self.started = time.monotonic()
+    self.finished = {}
+
+  def _finish(self, name):
+    self.finished[name] = time.monotonic() - self.started
+
+  def _start_of(self, name):
+    return max([self.finished.get(dep, 0.0) for dep in self.depends_on[name]], default=0.0)
+
+  def durations(self):
+    return {name: end - self._start_of(name) for name, end in self.finished.items()}
+
+  def critical_path(self):
+    if not self.finished:
+      return []
+    name = max(self.finished, key=self.finished.get)
+    path = [name]
+    while self.depends_on.get(name):
+      name = max(self.depends_on[name], key=lambda dep: self.finished.get(dep, 0.0))
+      path.insert(0, name)
+    return path
+
+  def report(self):
+    durations = self.durations()
+    lines = ["{}: {:.1f}s (finished at {:.1f}s)".format(name, durations[name], end)
+             for name, end in sorted(self.finished.items(), key=lambda item: item[1])]
+    lines.append("Critical path: " + " -> ".join(self.critical_path()))
+    return "\n".join(lines)
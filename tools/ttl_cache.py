@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache():
+  """Thread-safe in-memory LRU cache whose entries expire after `ttl` seconds."""
+
+  def __init__(self, maxsize=256, ttl=900):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self._data = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key, default=None):
+    with self._lock:
+      value = self._get(key)
+      if value is _MISSING:
+        self.misses += 1
+        return default
+      self.hits += 1
+      return value
+
+  def _get(self, key):
+    item = self._data.get(key)
+    if item is None:
+      return _MISSING
+    expires, value = item
+    if expires < time.monotonic():
+      del self._data[key]
+      return _MISSING
+    self._data.move_to_end(key)
+    return value
+
+  def set(self, key, value, ttl=None):
+    with self._lock:
+      self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+      self._data.move_to_end(key)
+      while len(self._data) > self.maxsize:
+        self._data.popitem(last=False)
+
+  def __contains__(self, key):
+    with self._lock:
+      return self._get(key) is not _MISSING
+
+  def __len__(self):
+    return len(self._data)
+
+  def clear(self):
+    with self._lock:
+      self._data.clear()
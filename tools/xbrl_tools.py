@@ -0,0 +1,197 @@
+import functools
+import json
+import os
+import re
+import time
+
+import pandas as pd
+from langchain.tools import tool
+
+from tools.cache_paths import cache_dir
+from tools.crew_runner import report
+from tools.http_cache import http_cache
+
+# SEC asks automated clients to identify themselves, e.g. "Company Name admin@company.com"
+SEC_HEADERS = {'User-Agent': os.environ.get('SEC_USER_AGENT', 'financial_analysis')}
+
+XBRL_CACHE_TTL = int(os.environ.get("XBRL_CACHE_TTL", 24 * 3600))
+
+# Friendly metric names mapped to XBRL concepts, in order of preference.
+# Companies switch concepts over time (e.g. SalesRevenueNet before ASC 606),
+# so a metric's history is stitched together from all of its aliases.
+METRICS = {
+  "revenue": ["RevenueFromContractWithCustomerExcludingAssessedTax", "Revenues", "SalesRevenueNet"],
+  "net_income": ["NetIncomeLoss"],
+  "operating_income": ["OperatingIncomeLoss"],
+  "eps_basic": ["EarningsPerShareBasic"],
+  "eps_diluted": ["EarningsPerShareDiluted"],
+  "assets": ["Assets"],
+  "liabilities": ["Liabilities"],
+  "equity": ["StockholdersEquity", "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"],
+  "long_term_debt": ["LongTermDebtNoncurrent", "LongTermDebt"],
+  "cash": ["CashAndCashEquivalentsAtCarryingValue"],
+  "operating_cash_flow": ["NetCashProvidedByUsedInOperatingActivities"],
+  "shares_outstanding": ["EntityCommonStockSharesOutstanding"],
+}
+
+COLUMNS = ["taxonomy", "concept", "unit", "value", "start", "end", "fy", "fp", "form", "filed", "accn"]
+
+
+class XBRLTools():
+  @tool("Query XBRL financial facts")
+  def query_facts(data):
+    """
+    Useful to get the reported values of one financial metric for a
+    stock straight from its XBRL filing data, without searching the
+    filing text.
+    The input to this tool should be a pipe (|) separated text of
+    length three: the stock ticker, the metric and the periods. Periods
+    is `FY` (annual) or `Q` (quarterly) followed by how many periods.
+    Metrics: revenue, net_income, operating_income, eps_basic,
+    eps_diluted, assets, liabilities, equity, long_term_debt, cash,
+    operating_cash_flow, shares_outstanding, or any us-gaap concept name.
+    For example, `AAPL|revenue|Q8`.
+    """
+    stock, metric, periods = (data.split("|") + ["", ""])[:3]
+    annual, count = XBRLTools._parse_periods(periods)
+    report('Looking up {} for {} in XBRL facts... '.format(metric, stock))
+    try:
+      series = XBRLTools.series(stock.strip(), metric.strip(), annual, count)
+    except KeyError as e:
+      return str(e.args[0])
+    if series.empty:
+      return "No reported values of {} found for {}.".format(metric, stock)
+    return series.to_string()
+
+  @tool("XBRL financial ratio table")
+  def ratio_table(data):
+    """
+    Useful to get a multi-period table of a stock's key financials and
+    ratios (year-over-year revenue and EPS growth, net margin,
+    debt-to-equity) straight
+    from its XBRL filing data.
+    The input to this tool should be a pipe (|) separated text of
+    length two: the stock ticker and the periods, `FY` (annual) or `Q`
+    (quarterly) followed by how many periods.
+    For example, `AAPL|FY5`.
+    """
+    stock, periods = (data.split("|") + [""])[:2]
+    annual, count = XBRLTools._parse_periods(periods)
+    report('Building ratio table for {} from XBRL facts... '.format(stock))
+    try:
+      table = XBRLTools.ratios(stock.strip(), annual, count)
+    except KeyError as e:
+      return str(e.args[0])
+    if table.empty:
+      return "No reported financials found for {}.".format(stock)
+    return table.to_string(float_format=lambda v: "{:,.4g}".format(v))
+
+  def _parse_periods(periods):
+    match = re.match(r"\s*(FY|Q)?\s*(\d+)?", periods.strip().upper())
+    annual = match.group(1) != "Q"
+    count = int(match.group(2) or (5 if annual else 8))
+    return annual, count
+
+  @functools.lru_cache(maxsize=1)
+  def _tickers():
+    data = json.loads(http_cache.get("https://www.sec.gov/files/company_tickers.json", headers=SEC_HEADERS))
+    return {row["ticker"].upper(): (int(row["cik_str"]), row["title"]) for row in data.values()}
+
+  def cik(ticker):
+    try:
+      return XBRLTools._tickers()[ticker.upper()][0]
+    except KeyError:
+      raise KeyError("Sorry, I couldn't find the ticker {}, check if it is correct.".format(ticker))
+
+  def facts(ticker):
+    """All XBRL facts for `ticker` as a DataFrame, parsed once and kept as Parquet."""
+    path = os.path.join(cache_dir("xbrl"), "{}.parquet".format(ticker.upper()))
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < XBRL_CACHE_TTL:
+      return pd.read_parquet(path)
+
+    url = "https://data.sec.gov/api/xbrl/companyfacts/CIK{:010d}.json".format(XBRLTools.cik(ticker))
+    company = json.loads(http_cache.get(url, headers=SEC_HEADERS))
+    rows = [
+      (taxonomy, concept, unit, fact["val"], fact.get("start"), fact["end"],
+       fact.get("fy"), fact.get("fp"), fact.get("form"), fact.get("filed"), fact.get("accn"))
+      for taxonomy, concepts in company["facts"].items()
+      for concept, detail in concepts.items()
+      for unit, facts in detail["units"].items()
+      for fact in facts
+    ]
+    df = pd.DataFrame.from_records(rows, columns=COLUMNS)
+    for column in ["start", "end", "filed"]:
+      df[column] = pd.to_datetime(df[column])
+    for column in ["taxonomy", "concept", "unit", "fp", "form"]:
+      df[column] = df[column].astype("category")
+    df["value"] = df["value"].astype("float64")
+    df["fy"] = df["fy"].astype("Int64")
+    df.to_parquet(path, index=False)
+    return df
+
+  def series(ticker, metric, annual=True, periods=5, df=None):
+    """Values of `metric` for the last `periods` fiscal years or quarters, indexed by period end."""
+    df = XBRLTools.facts(ticker) if df is None else df
+    concepts = METRICS.get(metric.lower(), [metric])
+    empty = pd.Series(dtype="float64", name=metric, index=pd.DatetimeIndex([], name="end"))
+    rows = df[df["concept"].isin(concepts)]
+    if rows.empty:
+      return empty
+
+    instant = rows["start"].isna()
+    days = (rows["end"] - rows["start"]).dt.days
+    if annual:
+      keep = rows["form"].str.startswith("10-K", na=False) & (instant | days.between(350, 380))
+    else:
+      keep = rows["form"].str.match(r"10-[KQ]", na=False) & (instant | days.between(80, 100))
+      fourth = XBRLTools._fourth_quarters(rows, days)
+    rows = rows[keep]
+    if not annual and not fourth.empty:
+      rows = pd.concat([rows, fourth])
+    if rows.empty:
+      return empty
+    rows = rows.assign(priority=rows["concept"].map({c: i for i, c in enumerate(concepts)}).astype(int))
+
+    # Prefer the first alias, then the latest filing (restatements win)
+    rows = rows.sort_values(["end", "priority", "filed"], ascending=[True, True, False])
+    rows = rows.drop_duplicates("end").tail(periods)
+    return rows.set_index("end")["value"].rename(metric)
+
+  def _fourth_quarters(rows, days):
+    """Fourth quarters derived as the fiscal year less its first nine months.
+
+    10-K filings report the whole year but no three-month fourth quarter.
+    """
+    latest = lambda frame: frame.sort_values("filed", ascending=False).drop_duplicates(["concept", "unit", "start", "end"])
+    years = latest(rows[rows["form"].str.startswith("10-K", na=False) & days.between(350, 380)])
+    nine_months = latest(rows[days.between(260, 290)])
+    fourth = years.merge(nine_months[["concept", "unit", "start", "end", "value"]],
+                         on=["concept", "unit", "start"], suffixes=("", "_nine_months"))
+    fourth["value"] = fourth["value"] - fourth["value_nine_months"]
+    fourth["start"] = fourth["end_nine_months"] + pd.Timedelta(days=1)
+    fourth["fp"] = "Q4"
+    return fourth[rows.columns]
+
+  def _year_over_year(column):
+    # Same period a year earlier; 52/53-week fiscal years end a few days apart
+    earlier = column.reindex(column.index - pd.DateOffset(years=1), method="nearest", tolerance=pd.Timedelta(days=15))
+    return column / earlier.to_numpy() - 1
+
+  def ratios(ticker, annual=True, periods=5, df=None):
+    """Key financials for the last `periods` periods with year-over-year growth and leverage ratios."""
+    df = XBRLTools.facts(ticker) if df is None else df
+    names = ["revenue", "net_income", "eps_diluted", "equity", "long_term_debt", "liabilities"]
+    # A year of history before the first period shown, for the growth columns
+    extra = 1 if annual else 4
+    table = pd.concat([XBRLTools.series(ticker, name, annual, periods + extra, df) for name in names], axis=1)
+    table = table[table[["revenue", "net_income"]].notna().any(axis=1)].sort_index()
+    if table.empty:
+      return table
+    table["revenue_growth"] = XBRLTools._year_over_year(table["revenue"])
+    table["eps_growth"] = XBRLTools._year_over_year(table["eps_diluted"])
+    table["net_margin"] = table["net_income"] / table["revenue"]
+    table["debt_to_equity"] = table["long_term_debt"] / table["equity"]
+    table["liabilities_to_equity"] = table["liabilities"] / table["equity"]
+    table.index = table.index.date
+    table.index.name = "period_end"
+    return table.tail(periods)